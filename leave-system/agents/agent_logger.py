@@ -3,15 +3,81 @@ Agent Logger for Leave System
 Tracks AI agent decision-making process and conversations
 """
 
+import atexit
+import functools
 import json
 import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, BinaryIO, Iterator, List, Optional, Set, Tuple
 from pathlib import Path
 import logging
 
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    _loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+# Set AGENT_LOG=0 to switch agent decision logging off entirely
+AGENT_LOG_ENABLED = os.getenv('AGENT_LOG', '1') == '1'
+
+# Log directories already created by this process
+_ENSURED_DIRS: Set[Path] = set()
+
+# Buffered entries for a chat are written out once they reach this size
+_MAX_BUFFER_BYTES = 64 * 1024
+
+# Most log files kept open for appending at once (least recently used is closed)
+_MAX_FDS = 32
+
+# Loggers not yet closed; one exit hook flushes them all without keeping
+# any of them alive
+_OPEN_LOGGERS: "weakref.WeakSet[AgentLogger]" = weakref.WeakSet()
+
+# Single-character substitutions for chat ids used in log file names
+_CHAT_ID_TRANS = str.maketrans({'/': '_'})
+
+
+@functools.lru_cache(maxsize=256)
+def _safe_chat_id(chat_id: str) -> str:
+    """Sanitize chat_id for use in a filename"""
+    return chat_id.translate(_CHAT_ID_TRANS).replace('@', '_at_')
+
+
+# (second, formatted "YYYY-MM-DDTHH:MM:SS") for the last second seen; read and
+# replaced as one tuple so concurrent callers never mix two seconds
+_ts_cache = (0, '')
+
+
+@functools.lru_cache(maxsize=256)
+def _json_str(value: str) -> bytes:
+    """JSON-encode a string that repeats across entries (chat ids, stages)"""
+    return _dumps(value)
+
+
+def _now_iso() -> str:
+    """Local ISO-8601 timestamp, reformatting the date/time part once per second"""
+    global _ts_cache
+    t = time.time()
+    sec = int(t)
+    cached_sec, prefix = _ts_cache
+    if sec != cached_sec:
+        prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(sec))
+        _ts_cache = (sec, prefix)
+    return f"{prefix}.{int((t - sec) * 1e6):06d}"
+
 
 class AgentLogger:
     """
@@ -27,7 +93,28 @@ class AgentLogger:
             log_dir: Directory to store agent logs
         """
         self.log_dir = Path(log_dir)
-        self.log_dir.mkdir(parents=True, exist_ok=True)
+        if self.log_dir not in _ENSURED_DIRS:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            _ENSURED_DIRS.add(self.log_dir)
+
+        # Serialized JSONL lines waiting to be written, keyed by (chat, date)
+        self._buffers: Dict[Tuple[str, str], List[bytes]] = {}
+        self._buffer_bytes: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+        # Append-mode handles for recently written log files
+        self._fds: "OrderedDict[Path, BinaryIO]" = OrderedDict()
+
+        # Single writer thread keeps disk I/O off the request path, in order
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='agent-log')
+
+        # Make sure nothing buffered is lost when the process exits
+        _OPEN_LOGGERS.add(self)
+
+    @property
+    def _enabled(self) -> bool:
+        """Whether entries should be recorded at all (re-checked on every call)"""
+        return AGENT_LOG_ENABLED and logger.isEnabledFor(logging.INFO)
 
     def log_received_message(
         self,
@@ -37,19 +124,19 @@ class AgentLogger:
         channel: str
     ):
         """Log when a message is received"""
-        entry = {
-            "timestamp": datetime.now().isoformat(),
-            "chat_id": chat_id,
-            "stage": "received",
-            "sender": sender,
-            "channel": channel,
-            "message": message,
-            "logic": {
+        if not self._enabled:
+            return
+
+        self._emit(
+            chat_id, "received",
+            sender=sender,
+            channel=channel,
+            message=message,
+            logic={
                 "message_length": len(message),
                 "has_content": bool(message.strip())
             }
-        }
-        self._write_log_entry(chat_id, entry)
+        )
 
     def log_analysis(
         self,
@@ -57,13 +144,10 @@ class AgentLogger:
         analysis: Dict[str, Any]
     ):
         """Log message analysis results"""
-        entry = {
-            "timestamp": datetime.now().isoformat(),
-            "chat_id": chat_id,
-            "stage": "analysis",
-            "logic": analysis
-        }
-        self._write_log_entry(chat_id, entry)
+        if not self._enabled:
+            return
+
+        self._emit(chat_id, "analysis", logic=analysis)
 
     def log_decision(
         self,
@@ -71,13 +155,10 @@ class AgentLogger:
         decision: Dict[str, Any]
     ):
         """Log agent decision"""
-        entry = {
-            "timestamp": datetime.now().isoformat(),
-            "chat_id": chat_id,
-            "stage": "decision",
-            "logic": decision
-        }
-        self._write_log_entry(chat_id, entry)
+        if not self._enabled:
+            return
+
+        self._emit(chat_id, "decision", logic=decision)
 
     def log_response(
         self,
@@ -86,14 +167,10 @@ class AgentLogger:
         logic: Dict[str, Any]
     ):
         """Log generated response"""
-        entry = {
-            "timestamp": datetime.now().isoformat(),
-            "chat_id": chat_id,
-            "stage": "response",
-            "response": response,
-            "logic": logic
-        }
-        self._write_log_entry(chat_id, entry)
+        if not self._enabled:
+            return
+
+        self._emit(chat_id, "response", response=response, logic=logic)
 
     def log_error(
         self,
@@ -102,13 +179,10 @@ class AgentLogger:
         error: str
     ):
         """Log an error"""
-        entry = {
-            "timestamp": datetime.now().isoformat(),
-            "chat_id": chat_id,
-            "stage": stage,
-            "error": error
-        }
-        self._write_log_entry(chat_id, entry)
+        if not self._enabled:
+            return
+
+        self._emit(chat_id, stage, error=error)
 
     def log_leave_request_analysis(
         self,
@@ -128,27 +202,27 @@ class AgentLogger:
             missing_fields: Required fields that are missing
             next_action: What the agent should do next
         """
+        if not self._enabled:
+            return
+
         # Build detailed analysis text
-        analysis_detail = ""
+        detail_parts: List[str] = []
 
         if extracted_info:
-            analysis_detail += "Found information:\n"
-            for key, value in extracted_info.items():
-                analysis_detail += f"  - {key}: {value}\n"
+            detail_parts.append("Found information:\n")
+            detail_parts.extend(f"  - {key}: {value}\n" for key, value in extracted_info.items())
 
         if missing_fields:
-            analysis_detail += "\nMissing required information:\n"
-            for field in missing_fields:
-                analysis_detail += f"  - {field}\n"
-
-        analysis_detail += f"\nNext action: {next_action}\n"
-
-        entry = {
-            "timestamp": datetime.now().isoformat(),
-            "chat_id": chat_id,
-            "stage": "leave_request_analysis",
-            "message": message,
-            "logic": {
+            detail_parts.append("\nMissing required information:\n")
+            detail_parts.extend(f"  - {field}\n" for field in missing_fields)
+
+        detail_parts.append(f"\nNext action: {next_action}\n")
+        analysis_detail = "".join(detail_parts)
+
+        self._emit(
+            chat_id, "leave_request_analysis",
+            message=message,
+            logic={
                 "intent": "leave_request",
                 "message_content": message,
                 "extracted_info": extracted_info,
@@ -156,59 +230,160 @@ class AgentLogger:
                 "next_action": next_action,
                 "analysis_detail": analysis_detail
             }
-        }
-        self._write_log_entry(chat_id, entry)
+        )
 
-    def _write_log_entry(self, chat_id: str, entry: Dict[str, Any]):
-        """Write a log entry to the appropriate file"""
+    def _emit(self, chat_id: str, stage: str, **fields: Any):
+        """
+        Serialize an entry straight to a JSONL line and buffer it
+
+        The timestamp/chat_id/stage header is assembled from cached fragments,
+        so only the stage-specific fields go through the JSON encoder.
+        """
         try:
+            timestamp = _now_iso()
+            header = b''.join((
+                b'{"timestamp":"', timestamp.encode('ascii'),
+                b'","chat_id":', _json_str(chat_id),
+                b',"stage":', _json_str(stage)
+            ))
+            body = _dumps(fields)
+            line = header + (b',' + body[1:] if fields else b'}') + b'\n'
+
             # Create daily log file for each chat
-            date = datetime.now().strftime("%Y-%m-%d")
-            # Sanitize chat_id for filename
-            safe_chat_id = chat_id.replace('/', '_').replace('@', '_at_')
-            log_file = self.log_dir / f"{safe_chat_id}_{date}.jsonl"
+            key = (_safe_chat_id(chat_id), timestamp[:10])
+
+            with self._lock:
+                self._buffers.setdefault(key, []).append(line)
+                size = self._buffer_bytes.get(key, 0) + len(line)
+                self._buffer_bytes[key] = size
 
-            # Append to log file
-            with open(log_file, 'a') as f:
-                f.write(json.dumps(entry) + '\n')
+                # Write out in a single call once enough has accumulated
+                if size >= _MAX_BUFFER_BYTES:
+                    self._flush_key(key)
 
         except Exception as e:
             logger.error(f"Failed to write log entry: {e}")
 
-    def get_chat_logs(
+    def _flush_key(self, key: Tuple[str, str]):
+        """Hand buffered lines for one chat/date to the writer thread (lock held)"""
+        lines = self._buffers.pop(key, None)
+        self._buffer_bytes.pop(key, None)
+        if not lines:
+            return
+
+        safe_chat_id, date = key
+        log_file = self.log_dir / f"{safe_chat_id}_{date}.jsonl"
+
+        self._submit(self._write_lines, log_file, b''.join(lines))
+
+    def _submit(self, fn, *args) -> Optional[Future]:
+        """Run fn on the writer thread, or inline once it has shut down"""
+        try:
+            return self._writer.submit(fn, *args)
+        except RuntimeError:
+            # Executor already stopped (e.g. interpreter exit): write directly
+            fn(*args)
+            return None
+
+    def _write_lines(self, log_file: Path, data: bytes):
+        """Append data to log_file (writer thread only)"""
+        try:
+            self._get_fd(log_file).write(data)
+        except Exception as e:
+            logger.error(f"Failed to write log entries: {e}")
+
+    def _get_fd(self, log_file: Path) -> BinaryIO:
+        """Return an open append handle for log_file (writer thread only)"""
+        fd = self._fds.get(log_file)
+        if fd is not None:
+            self._fds.move_to_end(log_file)
+            return fd
+
+        fd = open(log_file, 'ab', buffering=0)
+        self._fds[log_file] = fd
+
+        if len(self._fds) > _MAX_FDS:
+            _, oldest = self._fds.popitem(last=False)
+            oldest.close()
+
+        return fd
+
+    def flush(self):
+        """Queue all buffered log entries for writing without waiting on disk"""
+        with self._lock:
+            for key in list(self._buffers):
+                self._flush_key(key)
+
+    def flush_sync(self):
+        """Write all buffered log entries and wait until they are on disk"""
+        self.flush()
+        done = self._submit(lambda: None)
+        if done is not None:
+            done.result()
+
+    def close(self):
+        """Flush buffered entries and close all open log files"""
+        _OPEN_LOGGERS.discard(self)
+        self.flush_sync()
+        self._writer.shutdown(wait=True)
+        while self._fds:
+            _, fd = self._fds.popitem()
+            try:
+                fd.close()
+            except Exception as e:
+                logger.error(f"Failed to close log file: {e}")
+
+    def iter_chat_logs(
         self,
         chat_id: str,
         date: str = None
-    ) -> List[Dict[str, Any]]:
+    ) -> Iterator[Dict[str, Any]]:
         """
-        Retrieve logs for a specific chat
+        Lazily yield logs for a specific chat, one parsed entry per line
 
         Args:
             chat_id: Chat identifier
             date: Date string (YYYY-MM-DD), defaults to today
 
-        Returns:
-            List of log entries
+        Yields:
+            Log entries in the order they were written
         """
         if date is None:
             date = datetime.now().strftime("%Y-%m-%d")
 
-        safe_chat_id = chat_id.replace('/', '_').replace('@', '_at_')
+        safe_chat_id = _safe_chat_id(chat_id)
         log_file = self.log_dir / f"{safe_chat_id}_{date}.jsonl"
 
+        # Include anything still buffered or queued for the writer thread
+        self.flush_sync()
+
         if not log_file.exists():
-            return []
+            return
 
-        entries = []
         try:
-            with open(log_file, 'r') as f:
+            with open(log_file, 'rb') as f:
                 for line in f:
                     if line.strip():
-                        entries.append(json.loads(line))
+                        yield _loads(line)
         except Exception as e:
             logger.error(f"Failed to read log file: {e}")
 
-        return entries
+    def get_chat_logs(
+        self,
+        chat_id: str,
+        date: str = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve logs for a specific chat
+
+        Args:
+            chat_id: Chat identifier
+            date: Date string (YYYY-MM-DD), defaults to today
+
+        Returns:
+            List of log entries
+        """
+        return list(self.iter_chat_logs(chat_id, date))
 
     def generate_human_readable_log(
         self,
@@ -225,40 +400,48 @@ class AgentLogger:
         Returns:
             Human-readable log text
         """
-        entries = self.get_chat_logs(chat_id, date)
+        parts: List[str] = [f"=== Agent Logs for {chat_id} ({date or 'today'}) ===\n\n"]
+        i = 0
 
-        if not entries:
-            return f"No logs found for {chat_id} on {date or 'today'}\n"
+        for i, entry in enumerate(self.iter_chat_logs(chat_id, date), 1):
+            eg = entry.get
 
-        output = f"=== Agent Logs for {chat_id} ({date or 'today'}) ===\n\n"
+            parts.append(f"[{i}] {eg('timestamp', 'unknown')} - Stage: {eg('stage', 'unknown')}\n")
 
-        for i, entry in enumerate(entries, 1):
-            timestamp = entry.get('timestamp', 'unknown')
-            stage = entry.get('stage', 'unknown')
+            sender = eg('sender')
+            if sender:
+                parts.append(f"    Sender: {sender}\n")
 
-            output += f"[{i}] {timestamp} - Stage: {stage}\n"
+            message = eg('message')
+            if message:
+                parts.append(f"    Message: {message}\n")
 
-            if entry.get('sender'):
-                output += f"    Sender: {entry['sender']}\n"
+            logic = eg('logic')
+            if logic:
+                parts.append("    Logic/Analysis:\n")
+                parts.extend(
+                    f"      {value}\n" if key == 'analysis_detail' else f"      {key}: {value}\n"
+                    for key, value in logic.items()
+                )
 
-            if entry.get('message'):
-                output += f"    Message: {entry['message']}\n"
+            response = eg('response')
+            if response:
+                parts.append(f"    Response: {response}\n")
 
-            if entry.get('logic'):
-                output += "    Logic/Analysis:\n"
-                logic = entry['logic']
-                for key, value in logic.items():
-                    if key == 'analysis_detail':
-                        output += f"      {value}\n"
-                    else:
-                        output += f"      {key}: {value}\n"
+            error = eg('error')
+            if error:
+                parts.append(f"    Error: {error}\n")
 
-            if entry.get('response'):
-                output += f"    Response: {entry['response']}\n"
+            parts.append("\n")
+
+        if not i:
+            return f"No logs found for {chat_id} on {date or 'today'}\n"
 
-            if entry.get('error'):
-                output += f"    Error: {entry['error']}\n"
+        return "".join(parts)
 
-            output += "\n"
 
-        return output
+@atexit.register
+def _close_open_loggers():
+    """Close every logger still open when the process exits"""
+    for agent_logger in list(_OPEN_LOGGERS):
+        agent_logger.close()
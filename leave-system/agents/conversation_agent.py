@@ -3,11 +3,14 @@ Conversational AI Agent for Leave System
 Handles natural language interactions with parents and housemasters
 """
 
+import functools
 import os
+import re
 import json
-from typing import Dict, Any, List, Optional
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Any, Iterable, List, Optional
 from datetime import datetime
-import anthropic
 import logging
 
 from processors.leave_processor import LeaveProcessor
@@ -15,6 +18,68 @@ from agents.agent_logger import AgentLogger
 
 logger = logging.getLogger(__name__)
 
+# Keyword patterns for _analyze_message (plain substring matches, one scan each)
+_LEAVE_RE = re.compile(r'leave|exeat|weekend|overnight|supper')
+_STUDENT_RE = re.compile(r'son|daughter|child|student')
+# Day names and numeric dates share one pattern so a single search covers both
+_DATE_RE = re.compile(
+    r'tomorrow|saturday|weekend|friday|monday|tuesday|wednesday|thursday'
+    r'|next week|this weekend'
+    r'|\d{1,2}[/-]\d{1,2}|\d{1,2}\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)'
+)
+_LEAVE_TYPE_RE = re.compile(r'overnight|friday supper|day leave|day exeat')
+_BALANCE_RE = re.compile(r'balance|how many|remaining')
+_QUESTION_RE = re.compile(r'\?|how|what|when|can')
+
+# First characters of every intent keyword above; a message containing none of
+# them cannot match any intent, so the regex scans can be skipped entirely
+_INTENT_FIRST_CHARS = frozenset('lewosbhmrc?')
+
+# Conversation history sent to the model is capped at this many messages
+_MAX_HISTORY = 10
+_MESSAGE_KEYS = frozenset(('role', 'content'))
+
+# Chats whose recent history is kept in memory (least recently used evicted)
+_MAX_CHATS = 1024
+
+# Fixed instructions appended after the per-message analysis in the system prompt
+_SYSTEM_PROMPT_TAIL = """
+
+If this is a leave request and information is missing, specifically ask for the missing fields.
+If you need a student ID, say so explicitly.
+If dates are unclear, ask for clarification.
+
+Be concise and helpful."""
+
+
+@functools.lru_cache(maxsize=4)
+def _load_agent_context_cached(context_path: Optional[str]) -> str:
+    """Read the agent context file once per path and process"""
+    # If no path provided, use default location in agents folder
+    if context_path is None:
+        context_path = os.path.join(os.path.dirname(__file__), 'context.md')
+
+    if os.path.exists(context_path):
+        with open(context_path, 'r') as f:
+            return f.read()
+
+    # Default context if file not found
+    return """You are a helpful assistant for the Michaelhouse Leave Management System.
+
+You help parents request leave for their sons and help housemasters manage leave policies.
+
+When processing leave requests:
+1. Extract student name/ID, dates, and leave type
+2. Be polite and professional
+3. If information is missing, ask for it specifically
+4. Confirm details before processing
+
+When you don't have information, ask for it explicitly. For example:
+- "I need the student ID to process this request. Could you provide it?"
+- "What are the specific dates for this leave request?"
+
+Always be helpful and guide users through the process."""
+
 
 class ConversationAgent:
     """
@@ -35,10 +100,13 @@ class ConversationAgent:
             logger.warning("ANTHROPIC_API_KEY not set - agent will use fallback responses")
             self.client = None
         else:
+            # Imported here so processes without an API key never load the SDK
+            import anthropic
             self.client = anthropic.Anthropic(api_key=self.api_key)
 
         # Load agent context/personality
         self.context = self._load_agent_context(agent_context_path)
+        self._system_prompt_prefix = self.context + "\n\nCurrent Analysis:\n"
 
         # Initialize processors
         self.leave_processor = LeaveProcessor()
@@ -46,32 +114,39 @@ class ConversationAgent:
         # Initialize logger
         self.agent_logger = AgentLogger()
 
+        # Recent messages per chat, used when callers don't send history
+        self._history_cache: "OrderedDict[str, Deque[Dict[str, str]]]" = OrderedDict()
+        self._history_lock = threading.Lock()
+
     def _load_agent_context(self, context_path: Optional[str]) -> str:
         """Load agent personality/context from file"""
-        # If no path provided, use default location in agents folder
-        if context_path is None:
-            context_path = os.path.join(os.path.dirname(__file__), 'context.md')
+        return _load_agent_context_cached(context_path)
 
-        if os.path.exists(context_path):
-            with open(context_path, 'r') as f:
-                return f.read()
-
-        # Default context if file not found
-        return """You are a helpful assistant for the Michaelhouse Leave Management System.
-
-You help parents request leave for their sons and help housemasters manage leave policies.
+    def _get_history(
+        self,
+        chat_id: str,
+        conversation_history: Optional[Iterable[Dict[str, str]]]
+    ) -> Deque[Dict[str, str]]:
+        """
+        Return the bounded history deque for a chat
 
-When processing leave requests:
-1. Extract student name/ID, dates, and leave type
-2. Be polite and professional
-3. If information is missing, ask for it specifically
-4. Confirm details before processing
+        History passed in by the caller replaces what is cached; otherwise the
+        cached history from earlier turns of this chat is reused.
+        """
+        with self._history_lock:
+            if conversation_history is not None:
+                history = deque(conversation_history, maxlen=_MAX_HISTORY)
+            else:
+                history = self._history_cache.get(chat_id)
+                if history is None:
+                    history = deque(maxlen=_MAX_HISTORY)
 
-When you don't have information, ask for it explicitly. For example:
-- "I need the student ID to process this request. Could you provide it?"
-- "What are the specific dates for this leave request?"
+            self._history_cache[chat_id] = history
+            self._history_cache.move_to_end(chat_id)
+            if len(self._history_cache) > _MAX_CHATS:
+                self._history_cache.popitem(last=False)
 
-Always be helpful and guide users through the process."""
+        return history
 
     def process_message(
         self,
@@ -89,11 +164,14 @@ Always be helpful and guide users through the process."""
             sender: Sender identifier (phone/email)
             channel: Communication channel (whatsapp/email)
             chat_id: Unique chat identifier for logging
-            conversation_history: Previous messages in this conversation
+            conversation_history: Previous messages in this conversation;
+                if None, the history remembered for chat_id is used
 
         Returns:
             Dict with 'response' and 'metadata' about the interaction
         """
+        history = self._get_history(chat_id, conversation_history)
+
         # Log received message
         self.agent_logger.log_received_message(
             chat_id=chat_id,
@@ -111,6 +189,9 @@ Always be helpful and guide users through the process."""
             analysis=analysis
         )
 
+        # Start writing these entries while the request is processed
+        self.agent_logger.flush()
+
         # If it's a clear leave request with all information, process it directly
         if analysis['intent'] == 'leave_request' and analysis['has_all_info']:
             result = self.leave_processor.process_parent_request(
@@ -137,9 +218,13 @@ Always be helpful and guide users through the process."""
                 sender=sender,
                 channel=channel,
                 analysis=analysis,
-                conversation_history=conversation_history
+                conversation_history=history
             )
 
+        # Remember this turn for the chat's next message
+        history.append({"role": "user", "content": message})
+        history.append({"role": "assistant", "content": response_text})
+
         # Log response
         self.agent_logger.log_response(
             chat_id=chat_id,
@@ -151,6 +236,9 @@ Always be helpful and guide users through the process."""
             }
         )
 
+        # Queue the remaining entries; the writer thread puts them on disk
+        self.agent_logger.flush()
+
         return {
             'response': response_text,
             'metadata': {
@@ -181,44 +269,34 @@ Always be helpful and guide users through the process."""
 
         message_lower = message.lower()
 
+        if _INTENT_FIRST_CHARS.isdisjoint(message_lower):
+            return analysis
+
         # Detect leave request intent
-        leave_keywords = ['leave', 'exeat', 'weekend', 'overnight', 'supper']
-        if any(keyword in message_lower for keyword in leave_keywords):
+        if _LEAVE_RE.search(message_lower):
             analysis['intent'] = 'leave_request'
 
             # Check for student identifier
-            if not any(indicator in message_lower for indicator in ['son', 'daughter', 'child', 'student']):
+            if not _STUDENT_RE.search(message_lower):
                 analysis['missing_fields'].append('student_identifier')
 
-            # Check for dates
-            date_indicators = ['tomorrow', 'saturday', 'weekend', 'friday',
-                             'monday', 'tuesday', 'wednesday', 'thursday',
-                             'next week', 'this weekend']
-            has_date = any(indicator in message_lower for indicator in date_indicators)
-
-            # Also check for numeric dates
-            import re
-            date_patterns = [r'\d{1,2}[/-]\d{1,2}', r'\d{1,2}\s+(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)']
-            has_date = has_date or any(re.search(pattern, message_lower) for pattern in date_patterns)
-
-            if not has_date:
+            # Check for dates (day names or numeric dates)
+            if not _DATE_RE.search(message_lower):
                 analysis['missing_fields'].append('dates')
 
             # Check for leave type clarity
-            leave_type_clear = any(keyword in message_lower for keyword in
-                                  ['overnight', 'friday supper', 'day leave', 'day exeat'])
-            if not leave_type_clear:
+            if not _LEAVE_TYPE_RE.search(message_lower):
                 analysis['missing_fields'].append('leave_type')
 
             # Determine if we have enough info
             analysis['has_all_info'] = len(analysis['missing_fields']) == 0
 
         # Detect balance query
-        elif any(keyword in message_lower for keyword in ['balance', 'how many', 'remaining']):
+        elif _BALANCE_RE.search(message_lower):
             analysis['intent'] = 'balance_query'
 
         # Detect general query
-        elif any(keyword in message_lower for keyword in ['?', 'how', 'what', 'when', 'can']):
+        elif _QUESTION_RE.search(message_lower):
             analysis['intent'] = 'question'
 
         return analysis
@@ -229,7 +307,7 @@ Always be helpful and guide users through the process."""
         sender: str,
         channel: str,
         analysis: Dict[str, Any],
-        conversation_history: Optional[List[Dict[str, str]]] = None
+        conversation_history: Optional[Deque[Dict[str, str]]] = None
     ) -> str:
         """
         Generate a conversational response using Claude AI
@@ -252,13 +330,19 @@ Always be helpful and guide users through the process."""
             # Build conversation context
             messages = []
 
-            # Add conversation history if available
+            # Add conversation history if available (last _MAX_HISTORY messages)
             if conversation_history:
-                for msg in conversation_history[-10:]:  # Last 10 messages
-                    messages.append({
-                        "role": msg.get("role", "user"),
-                        "content": msg.get("content", "")
-                    })
+                history = conversation_history
+                for i in range(max(0, len(history) - _MAX_HISTORY), len(history)):
+                    msg = history[i]
+                    # Reuse messages already in API shape instead of rebuilding them
+                    if msg.keys() == _MESSAGE_KEYS:
+                        messages.append(msg)
+                    else:
+                        messages.append({
+                            "role": msg.get("role", "user"),
+                            "content": msg.get("content", "")
+                        })
 
             # Add current message
             messages.append({
@@ -267,18 +351,13 @@ Always be helpful and guide users through the process."""
             })
 
             # Build system prompt with analysis context
-            system_prompt = self.context + f"""
-
-Current Analysis:
-- Intent: {analysis['intent']}
-- Has complete info: {analysis['has_all_info']}
-- Missing fields: {', '.join(analysis['missing_fields']) if analysis['missing_fields'] else 'none'}
-
-If this is a leave request and information is missing, specifically ask for the missing fields.
-If you need a student ID, say so explicitly.
-If dates are unclear, ask for clarification.
-
-Be concise and helpful."""
+            system_prompt = "".join((
+                self._system_prompt_prefix,
+                "- Intent: ", analysis['intent'],
+                "\n- Has complete info: ", str(analysis['has_all_info']),
+                "\n- Missing fields: ", ", ".join(analysis['missing_fields']) or "none",
+                _SYSTEM_PROMPT_TAIL
+            ))
 
             # Call Anthropic API
             response = self.client.messages.create(
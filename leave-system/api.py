@@ -4,13 +4,11 @@ Flask API for Michaelhouse Leave System
 Provides HTTP endpoints for WhatsApp bridge integration
 """
 
-import sys
-from pathlib import Path
-sys.path.insert(0, str(Path(__file__).parent))
-
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, current_app, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from processors.leave_processor import LeaveProcessor
 from agents.conversation_agent import ConversationAgent
+import functools
 import logging
 import os
 from dotenv import load_dotenv
@@ -25,50 +23,146 @@ logging.basicConfig(
 )
 logger = logging.getLogger('leave_api')
 
-app = Flask(__name__)
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-# Initialize backend (Google Sheets or PostgreSQL)
-use_sheets = os.getenv('USE_GOOGLE_SHEETS', 'false').lower() == 'true'
-use_simple_oauth = os.getenv('USE_SIMPLE_OAUTH', 'false').lower() == 'true'
+bp = Blueprint('leave_api', __name__)
 
-if use_sheets:
-    try:
-        if use_simple_oauth:
-            # Use simplified OAuth with personal Google account
-            from tools.google_sheets_simple import GoogleSheetsSimple
-            tools = GoogleSheetsSimple()
-            logger.info("✅ Using Google Sheets backend (Simple OAuth)")
-        else:
-            # Use service account (original method)
-            from tools.google_sheets_tools import GoogleSheetsTools
-            tools = GoogleSheetsTools()
-            logger.info("✅ Using Google Sheets backend (Service Account)")
-    except Exception as e:
-        logger.error(f"Failed to initialize Google Sheets backend: {e}")
-        logger.info("Falling back to placeholder tools")
-        from tools.placeholder_tools import PlaceholderTools
-        tools = PlaceholderTools()
-else:
-    try:
-        from tools.database_tools import DatabaseTools
-        tools = DatabaseTools()
-        logger.info("✅ Using PostgreSQL database backend")
-    except Exception as e:
-        logger.error(f"Failed to initialize database backend: {e}")
-        logger.info("Falling back to placeholder tools")
-        from tools.placeholder_tools import PlaceholderTools
-        tools = PlaceholderTools()
+_VALID_CHANNELS = frozenset({'whatsapp', 'email'})
+
+
+# Processor result keys that make up the documented HTTP response; the
+# LeaveRequest and internal routing details stay in-process
+_RESPONSE_KEYS = ('status', 'message', 'reason')
+
+
+def _api_result(result):
+    """Project a processor result onto the response fields"""
+    return {key: result[key] for key in _RESPONSE_KEYS if key in result}
+
+
+def _require(*fields):
+    """
+    Validate the JSON body of a POST endpoint before calling the view
+
+    Rejects requests with no JSON, missing required fields or an unknown
+    channel, and passes the parsed body to the view as ``data``.
+    """
+    required = frozenset(fields)
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper():
+            data = request.get_json(silent=True)
+
+            if not data or not isinstance(data, dict):
+                return jsonify({
+                    'status': 'error',
+                    'message': 'No JSON data provided'
+                }), 400
+
+            missing = required.difference(data)
+            if missing:
+                return jsonify({
+                    'status': 'error',
+                    'message': f'Missing required fields: {", ".join(f for f in fields if f in missing)}'
+                }), 400
+
+            channel = data['channel']
+            if not isinstance(channel, str) or channel not in _VALID_CHANNELS:
+                return jsonify({
+                    'status': 'error',
+                    'message': f'Invalid channel: {channel}. Must be "whatsapp" or "email"'
+                }), 400
+
+            return view(data)
+        return wrapper
+    return decorator
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson for request and response bodies"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # jsonify() bodies go straight from orjson bytes, skipping str encode/decode
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default),
+            mimetype=self.mimetype
+        )
+
+
+def _init_tools():
+    """Initialize backend tools (Google Sheets or PostgreSQL)"""
+    use_sheets = os.getenv('USE_GOOGLE_SHEETS', 'false').lower() == 'true'
+    use_simple_oauth = os.getenv('USE_SIMPLE_OAUTH', 'false').lower() == 'true'
+
+    if use_sheets:
+        try:
+            if use_simple_oauth:
+                # Use simplified OAuth with personal Google account
+                from tools.google_sheets_simple import GoogleSheetsSimple
+                tools = GoogleSheetsSimple()
+                logger.info("✅ Using Google Sheets backend (Simple OAuth)")
+            else:
+                # Use service account (original method)
+                from tools.google_sheets_tools import GoogleSheetsTools
+                tools = GoogleSheetsTools()
+                logger.info("✅ Using Google Sheets backend (Service Account)")
+        except Exception as e:
+            logger.error(f"Failed to initialize Google Sheets backend: {e}")
+            logger.info("Falling back to placeholder tools")
+            from tools.placeholder_tools import LeaveSystemTools
+            tools = LeaveSystemTools()
+    else:
+        try:
+            from tools.database_tools import DatabaseTools
+            tools = DatabaseTools()
+            logger.info("✅ Using PostgreSQL database backend")
+        except Exception as e:
+            logger.error(f"Failed to initialize database backend: {e}")
+            logger.info("Falling back to placeholder tools")
+            from tools.placeholder_tools import LeaveSystemTools
+            tools = LeaveSystemTools()
+
+    return tools
+
+
+def create_app() -> Flask:
+    """
+    Build the Flask app with its processor and conversation agent
+
+    All expensive setup (backend tools, agent context, Anthropic client) happens
+    here once. With ``gunicorn --preload`` this runs in the master before
+    workers fork, so every worker shares the initialized objects.
+    """
+    app = Flask(__name__)
+    if orjson is not None:
+        app.json = ORJSONProvider(app)
+
+    # Initialize processor with selected tools
+    processor = LeaveProcessor(tools=_init_tools())
 
-# Initialize processor with selected tools
-processor = LeaveProcessor()
-processor.tools = tools
+    # Initialize conversation agent
+    # Agent will auto-load context from agents/context.md
+    conversation_agent = ConversationAgent()
 
-# Initialize conversation agent
-# Agent will auto-load context from agents/context.md
-conversation_agent = ConversationAgent()
+    app.extensions['leave_processor'] = processor
+    app.extensions['conversation_agent'] = conversation_agent
 
+    app.register_blueprint(bp)
+    return app
 
-@app.route('/health', methods=['GET'])
+
+@bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
@@ -78,8 +172,9 @@ def health_check():
     })
 
 
-@app.route('/api/process_parent_request', methods=['POST'])
-def process_parent_request():
+@bp.route('/api/process_parent_request', methods=['POST'])
+@_require('message', 'sender', 'channel')
+def process_parent_request(data):
     """
     Process parent leave request
 
@@ -98,38 +193,14 @@ def process_parent_request():
     }
     """
     try:
-        data = request.json
-
-        # Validate input
-        if not data:
-            return jsonify({
-                'status': 'error',
-                'message': 'No JSON data provided'
-            }), 400
-
-        required_fields = ['message', 'sender', 'channel']
-        missing_fields = [f for f in required_fields if f not in data]
-
-        if missing_fields:
-            return jsonify({
-                'status': 'error',
-                'message': f'Missing required fields: {", ".join(missing_fields)}'
-            }), 400
-
         message_text = data['message']
         sender_identifier = data['sender']
         channel = data['channel']
 
-        # Validate channel
-        if channel not in ['whatsapp', 'email']:
-            return jsonify({
-                'status': 'error',
-                'message': f'Invalid channel: {channel}. Must be "whatsapp" or "email"'
-            }), 400
-
         logger.info(f"Processing parent request from {sender_identifier} via {channel}")
 
         # Process the request
+        processor = current_app.extensions['leave_processor']
         result = processor.process_parent_request(
             message_text=message_text,
             sender_identifier=sender_identifier,
@@ -138,7 +209,7 @@ def process_parent_request():
 
         logger.info(f"Request processed: status={result['status']}")
 
-        return jsonify(result), 200
+        return jsonify(_api_result(result)), 200
 
     except Exception as e:
         logger.error(f"Error processing parent request: {e}", exc_info=True)
@@ -148,8 +219,9 @@ def process_parent_request():
         }), 500
 
 
-@app.route('/api/process_housemaster_request', methods=['POST'])
-def process_housemaster_request():
+@bp.route('/api/process_housemaster_request', methods=['POST'])
+@_require('message', 'sender', 'channel')
+def process_housemaster_request(data):
     """
     Process housemaster request (query, cancellation, restriction)
 
@@ -167,38 +239,14 @@ def process_housemaster_request():
     }
     """
     try:
-        data = request.json
-
-        # Validate input
-        if not data:
-            return jsonify({
-                'status': 'error',
-                'message': 'No JSON data provided'
-            }), 400
-
-        required_fields = ['message', 'sender', 'channel']
-        missing_fields = [f for f in required_fields if f not in data]
-
-        if missing_fields:
-            return jsonify({
-                'status': 'error',
-                'message': f'Missing required fields: {", ".join(missing_fields)}'
-            }), 400
-
         message_text = data['message']
         sender_identifier = data['sender']
         channel = data['channel']
 
-        # Validate channel
-        if channel not in ['whatsapp', 'email']:
-            return jsonify({
-                'status': 'error',
-                'message': f'Invalid channel: {channel}. Must be "whatsapp" or "email"'
-            }), 400
-
         logger.info(f"Processing housemaster request from {sender_identifier} via {channel}")
 
         # Process the request
+        processor = current_app.extensions['leave_processor']
         result = processor.process_housemaster_request(
             message_text=message_text,
             sender_identifier=sender_identifier,
@@ -207,7 +255,7 @@ def process_housemaster_request():
 
         logger.info(f"Housemaster request processed: status={result['status']}")
 
-        return jsonify(result), 200
+        return jsonify(_api_result(result)), 200
 
     except Exception as e:
         logger.error(f"Error processing housemaster request: {e}", exc_info=True)
@@ -217,8 +265,9 @@ def process_housemaster_request():
         }), 500
 
 
-@app.route('/api/conversation', methods=['POST'])
-def conversation():
+@bp.route('/api/conversation', methods=['POST'])
+@_require('message', 'sender', 'channel', 'chat_id')
+def conversation(data):
     """
     Process conversational message through AI agent
 
@@ -228,7 +277,7 @@ def conversation():
         "sender": "27603174174" or "parent@example.com",
         "channel": "whatsapp" or "email",
         "chat_id": "unique_chat_identifier",
-        "conversation_history": [  // optional
+        "conversation_history": [  // optional, defaults to the chat's recent history
             {"role": "user", "content": "previous message"},
             {"role": "assistant", "content": "previous response"}
         ]
@@ -245,40 +294,16 @@ def conversation():
     }
     """
     try:
-        data = request.json
-
-        # Validate input
-        if not data:
-            return jsonify({
-                'status': 'error',
-                'message': 'No JSON data provided'
-            }), 400
-
-        required_fields = ['message', 'sender', 'channel', 'chat_id']
-        missing_fields = [f for f in required_fields if f not in data]
-
-        if missing_fields:
-            return jsonify({
-                'status': 'error',
-                'message': f'Missing required fields: {", ".join(missing_fields)}'
-            }), 400
-
         message = data['message']
         sender = data['sender']
         channel = data['channel']
         chat_id = data['chat_id']
-        conversation_history = data.get('conversation_history', [])
-
-        # Validate channel
-        if channel not in ['whatsapp', 'email']:
-            return jsonify({
-                'status': 'error',
-                'message': f'Invalid channel: {channel}. Must be "whatsapp" or "email"'
-            }), 400
+        conversation_history = data.get('conversation_history')
 
         logger.info(f"Processing conversational message from {sender} via {channel}")
 
         # Process through conversation agent
+        conversation_agent = current_app.extensions['conversation_agent']
         result = conversation_agent.process_message(
             message=message,
             sender=sender,
@@ -299,7 +324,7 @@ def conversation():
         }), 500
 
 
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
     return jsonify({
@@ -308,7 +333,7 @@ def not_found(error):
     }), 404
 
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def internal_error(error):
     """Handle 500 errors"""
     logger.error(f"Internal server error: {error}")
@@ -318,6 +343,10 @@ def internal_error(error):
     }), 500
 
 
+# Built at import so `gunicorn --preload api:app` initializes once in the master
+app = create_app()
+
+
 if __name__ == '__main__':
     logger.info("Starting Michaelhouse Leave API on http://localhost:8090")
     logger.info("Endpoints:")
@@ -326,6 +355,6 @@ if __name__ == '__main__':
     logger.info("  POST /api/process_parent_request - Process parent leave requests (direct)")
     logger.info("  POST /api/process_housemaster_request - Process housemaster requests")
 
-    # Run in development mode
-    # For production, use: gunicorn -w 4 -b 0.0.0.0:8090 api:app
-    app.run(host='0.0.0.0', port=8090, debug=True)
+    # Development server only (no debug reloader)
+    # For production, use: gunicorn -c gunicorn_conf.py api:app
+    app.run(host='0.0.0.0', port=8090)
@@ -1,14 +1,22 @@
 #!/usr/bin/env python3
 """
-Flask API for Michaelhouse Leave System - PRODUCTION VERSION
+Quart (ASGI) API for Michaelhouse Leave System - PRODUCTION VERSION
 Uses real database tools instead of placeholders
 """
 
-import sys
-from pathlib import Path
-sys.path.insert(0, str(Path(__file__).parent))
-
-from flask import Flask, request, jsonify
+import asyncio
+import functools
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from quart import Quart, request, jsonify
+from quart.json.provider import DefaultJSONProvider
+from pydantic import BaseModel, ConfigDict, ValidationError
+from typing import Any, Dict, Literal, Optional, Tuple
 from processors.leave_processor import LeaveProcessor
 from tools.database_tools import DatabaseTools
 import logging
@@ -25,47 +33,279 @@ logging.basicConfig(
 )
 logger = logging.getLogger('leave_api')
 
-app = Flask(__name__)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Quart JSON provider backed by orjson; jsonify() bodies skip the str round-trip"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default),
+            mimetype=self.mimetype
+        )
+
+
+app = Quart(__name__)
+if orjson is not None:
+    app.json = ORJSONProvider(app)
+
+
+class ParentRequest(BaseModel):
+    """JSON body of /api/process_parent_request"""
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    message: str
+    sender: str
+    channel: Literal['whatsapp', 'email']
+
+
+class HousemasterRequest(ParentRequest):
+    """JSON body of /api/process_housemaster_request (same fields)"""
+
+
+def _validation_message(error: ValidationError) -> str:
+    """Turn a request model validation error into the API's error message"""
+    errors = error.errors()
+    missing = [str(e['loc'][0]) for e in errors if e['type'] == 'missing' and e['loc']]
+    if missing:
+        return f'Missing required fields: {", ".join(missing)}'
+
+    first = errors[0]
+    if first['loc'] == ('channel',):
+        return f'Invalid channel: {first["input"]}. Must be "whatsapp" or "email"'
+    if not first['loc']:
+        # Body is not valid JSON or not a JSON object
+        return 'No JSON data provided'
+    return f'Invalid value for {first["loc"][0]}: {first["msg"]}'
+
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Only final decisions are cached; errors are retried on the next request
+_CACHEABLE_STATUSES = frozenset({'approved', 'rejected', 'special_pending'})
+
+
+# Processor result keys that make up the documented HTTP response; the
+# LeaveRequest and internal routing details stay in-process
+_RESPONSE_KEYS = ('status', 'message', 'reason')
+
+
+def _api_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Project a processor result onto the response fields"""
+    return {key: result[key] for key in _RESPONSE_KEYS if key in result}
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries expire ttl seconds after being set"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[Any]:
+        """Return the live value for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Any, value: Any):
+        """Store value under key, evicting the least recently used entry if full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class LeaveResponseCache:
+    """
+    Short-lived cache of parent request results
+
+    Parents often re-send the same message (double taps, retries). Results are
+    keyed per sender and channel on the normalized message text and today's
+    date, so relative dates like "this Saturday" are never reused across
+    days. The TTL is kept short so a newly imposed restriction or balance
+    change is picked up quickly.
+    """
+
+    def __init__(self, ttl: float = 600.0, max_entries: int = 4096):
+        self._cache = TTLCache(maxsize=max_entries, ttl=ttl)
+
+    @staticmethod
+    def _key(sender: str, message: str, channel: str) -> Tuple[str, str, str, str]:
+        normalized = _WHITESPACE_RE.sub(' ', message).strip().lower()
+        return (sender, channel, normalized, date.today().isoformat())
+
+    def lookup(self, sender: str, message: str, channel: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for this request, or None"""
+        return self._cache.get(self._key(sender, message, channel))
+
+    def store(self, sender: str, message: str, channel: str, result: Dict[str, Any]):
+        """Remember a result if it is a final decision"""
+        if result.get('status') in _CACHEABLE_STATUSES:
+            self._cache.set(self._key(sender, message, channel), result)
+
+
+response_cache = LeaveResponseCache(ttl=float(os.getenv('PARENT_RESPONSE_CACHE_TTL', '600')))
+
+# Senders that failed parent authentication, answered without touching the
+# database until the entry expires
+unknown_senders = TTLCache(
+    maxsize=10_000,
+    ttl=float(os.getenv('UNKNOWN_SENDER_CACHE_TTL', '300'))
+)
+
 
 # Initialize with real database tools
 try:
     logger.info("Initializing database connection...")
     tools = DatabaseTools()
-    processor = LeaveProcessor()
-    processor.tools = tools
+    processor = LeaveProcessor(tools=tools)
     logger.info("✓ Database tools initialized successfully")
 except Exception as e:
-    logger.error(f"✗ Failed to initialize database tools: {e}")
+    logger.error("✗ Failed to initialize database tools: %s", e)
     logger.warning("Falling back to placeholder tools")
     processor = LeaveProcessor()
 
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    # Test database connection
-    db_status = "connected"
+# Processor calls run on a bounded pool; when too many are already waiting,
+# new requests are turned away with 503 instead of queueing without limit
+PROCESSOR_WORKERS = int(os.getenv('PROCESSOR_WORKERS', '16'))
+PROCESSOR_MAX_QUEUE = int(os.getenv('PROCESSOR_MAX_QUEUE', '64'))
+PROCESSOR_TIMEOUT = float(os.getenv('PROCESSOR_TIMEOUT', '30'))
+EXECUTOR = ThreadPoolExecutor(max_workers=PROCESSOR_WORKERS, thread_name_prefix='processor')
+
+
+class ProcessorOverloaded(Exception):
+    """Raised when the processor queue is full"""
+
+
+def _queue_depth() -> int:
+    """Number of processor calls waiting for a worker thread"""
+    return EXECUTOR._work_queue.qsize()
+
+
+async def _run_processor(func, on_late_result=None, **kwargs):
+    """
+    Run a blocking processor call on EXECUTOR, bounded by PROCESSOR_TIMEOUT
+
+    The worker thread cannot be interrupted, so a call that times out keeps
+    running. When on_late_result is given, it is called with the eventual
+    result so the caller can still record what the processor did.
+    """
+    if _queue_depth() >= PROCESSOR_MAX_QUEUE:
+        raise ProcessorOverloaded()
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(EXECUTOR, functools.partial(func, **kwargs))
     try:
-        if hasattr(processor.tools, '_get_connection'):
-            conn = processor.tools._get_connection()
-            if conn and not conn.closed:
-                db_status = "connected"
-            else:
-                db_status = "disconnected"
+        return await asyncio.wait_for(asyncio.shield(future), timeout=PROCESSOR_TIMEOUT)
+    except asyncio.TimeoutError:
+        future.add_done_callback(functools.partial(_finish_late_call, on_late_result))
+        raise
+
+
+def _finish_late_call(on_late_result, future):
+    """Done-callback for a timed-out processor call"""
+    if future.cancelled():
+        return
+    if future.exception() is not None:
+        logger.error("Timed-out processor call failed: %s", future.exception())
+        return
+    if on_late_result is None:
+        return
+    try:
+        on_late_result(future.result())
     except Exception as e:
-        db_status = f"error: {str(e)}"
+        logger.error("Failed to record late processor result: %s", e, exc_info=True)
 
+
+def _overloaded_response():
+    return jsonify({
+        'status': 'error',
+        'message': 'The leave system is busy. Please try again in a few minutes.'
+    }), 503
+
+
+def _timeout_response():
     return jsonify({
-        'status': 'healthy',
-        'service': 'Michaelhouse Leave API',
-        'version': '1.0.0',
-        'database': db_status,
-        'tools': 'production' if hasattr(processor.tools, '_get_connection') else 'placeholder'
-    })
+        'status': 'error',
+        'message': 'Your request is taking longer than expected. Please try again shortly.'
+    }), 504
+
+
+# Last database probe result, reused by /health for HEALTH_DB_TTL seconds
+HEALTH_DB_TTL = float(os.getenv('HEALTH_DB_TTL', '2.0'))
+_health_cache = {'ts': 0.0, 'status': None}
+_health_lock = asyncio.Lock()
+
+
+async def _db_status(ttl: float = HEALTH_DB_TTL) -> str:
+    """Return the database status, probing at most once per ttl seconds"""
+    async with _health_lock:
+        if _health_cache['status'] is not None and time.monotonic() - _health_cache['ts'] < ttl:
+            return _health_cache['status']
+
+        db_status = "connected"
+        try:
+            if hasattr(processor.tools, 'ping'):
+                if await asyncio.to_thread(processor.tools.ping):
+                    db_status = "connected"
+                else:
+                    db_status = "disconnected"
+        except Exception as e:
+            db_status = f"error: {str(e)}"
+
+        _health_cache['ts'] = time.monotonic()
+        _health_cache['status'] = db_status
+        return db_status
+
+
+# /health fields that never change, serialized once; the live fields are
+# appended before the closing brace on each request
+_HEALTH_PREFIX = app.json.dumps({
+    'status': 'healthy',
+    'service': 'Michaelhouse Leave API',
+    'version': '1.0.0',
+    'tools': 'production' if hasattr(processor.tools, '_get_connection') else 'placeholder'
+}).encode('utf-8')[:-1]
+
+
+@app.route('/health', methods=['GET'])
+async def health_check():
+    """Health check endpoint"""
+    # Test database connection (cached briefly so probes don't hit Postgres)
+    db_status = await _db_status()
+
+    body = b''.join((
+        _HEALTH_PREFIX,
+        b',"database":', app.json.dumps(db_status).encode('utf-8'),
+        b',"queue_depth":', str(_queue_depth()).encode('ascii'),
+        b'}'
+    ))
+    return app.response_class(body, mimetype='application/json')
 
 
 @app.route('/api/process_parent_request', methods=['POST'])
-def process_parent_request():
+async def process_parent_request():
     """
     Process parent leave request
 
@@ -84,50 +324,66 @@ def process_parent_request():
     }
     """
     try:
-        data = request.json
-
-        # Validate input
-        if not data:
+        # Parse and validate the body in one pass
+        try:
+            req = ParentRequest.model_validate_json(await request.get_data())
+        except ValidationError as e:
             return jsonify({
                 'status': 'error',
-                'message': 'No JSON data provided'
+                'message': _validation_message(e)
             }), 400
 
-        required_fields = ['message', 'sender', 'channel']
-        missing_fields = [f for f in required_fields if f not in data]
+        message_text = req.message
+        sender_identifier = req.sender
+        channel = req.channel
 
-        if missing_fields:
-            return jsonify({
-                'status': 'error',
-                'message': f'Missing required fields: {", ".join(missing_fields)}'
-            }), 400
+        logger.info("Processing parent request from %s via %s", sender_identifier, channel)
 
-        message_text = data['message']
-        sender_identifier = data['sender']
-        channel = data['channel']
+        # Unknown senders get their earlier rejection straight back
+        cached = unknown_senders.get((sender_identifier, channel))
+        if cached is not None:
+            logger.info("Rejected cached unknown sender %s", sender_identifier)
+            return jsonify(cached), 200
 
-        # Validate channel
-        if channel not in ['whatsapp', 'email']:
-            return jsonify({
-                'status': 'error',
-                'message': f'Invalid channel: {channel}. Must be "whatsapp" or "email"'
-            }), 400
+        # A repeat of a recent identical request gets the same answer
+        cached = response_cache.lookup(sender_identifier, message_text, channel)
+        if cached is not None:
+            logger.info("Request served from cache: status=%s", cached['status'])
+            return jsonify(cached), 200
 
-        logger.info(f"Processing parent request from {sender_identifier} via {channel}")
-
-        # Process the request
-        result = processor.process_parent_request(
+        def record(raw_result):
+            result = _api_result(raw_result)
+            if result.get('reason') == 'authentication_failed':
+                unknown_senders.set((sender_identifier, channel), result)
+            else:
+                response_cache.store(sender_identifier, message_text, channel, result)
+            return result
+
+        # Process the request off the event loop (DB and LLM calls block).
+        # A request that times out may still record leave, so its late result
+        # is cached too and a retry gets that answer instead of a second write
+        result = record(await _run_processor(
+            processor.process_parent_request,
+            on_late_result=record,
             message_text=message_text,
             sender_identifier=sender_identifier,
             channel=channel
-        )
+        ))
 
-        logger.info(f"Request processed: status={result['status']}")
+        logger.info("Request processed: status=%s", result['status'])
 
         return jsonify(result), 200
 
+    except ProcessorOverloaded:
+        logger.warning("Processor queue full, rejecting parent request")
+        return _overloaded_response()
+
+    except asyncio.TimeoutError:
+        logger.error("Parent request timed out")
+        return _timeout_response()
+
     except Exception as e:
-        logger.error(f"Error processing parent request: {e}", exc_info=True)
+        logger.error("Error processing parent request: %s", e, exc_info=True)
         return jsonify({
             'status': 'error',
             'message': 'An error occurred processing your request. Please contact the Housemaster.'
@@ -135,7 +391,7 @@ def process_parent_request():
 
 
 @app.route('/api/process_housemaster_request', methods=['POST'])
-def process_housemaster_request():
+async def process_housemaster_request():
     """
     Process housemaster request (query, cancellation, restriction)
 
@@ -153,50 +409,43 @@ def process_housemaster_request():
     }
     """
     try:
-        data = request.json
-
-        # Validate input
-        if not data:
+        # Parse and validate the body in one pass
+        try:
+            req = HousemasterRequest.model_validate_json(await request.get_data())
+        except ValidationError as e:
             return jsonify({
                 'status': 'error',
-                'message': 'No JSON data provided'
+                'message': _validation_message(e)
             }), 400
 
-        required_fields = ['message', 'sender', 'channel']
-        missing_fields = [f for f in required_fields if f not in data]
+        message_text = req.message
+        sender_identifier = req.sender
+        channel = req.channel
 
-        if missing_fields:
-            return jsonify({
-                'status': 'error',
-                'message': f'Missing required fields: {", ".join(missing_fields)}'
-            }), 400
-
-        message_text = data['message']
-        sender_identifier = data['sender']
-        channel = data['channel']
-
-        # Validate channel
-        if channel not in ['whatsapp', 'email']:
-            return jsonify({
-                'status': 'error',
-                'message': f'Invalid channel: {channel}. Must be "whatsapp" or "email"'
-            }), 400
-
-        logger.info(f"Processing housemaster request from {sender_identifier} via {channel}")
+        logger.info("Processing housemaster request from %s via %s", sender_identifier, channel)
 
-        # Process the request
-        result = processor.process_housemaster_request(
+        # Process the request off the event loop (DB and LLM calls block)
+        result = _api_result(await _run_processor(
+            processor.process_housemaster_request,
             message_text=message_text,
             sender_identifier=sender_identifier,
             channel=channel
-        )
+        ))
 
-        logger.info(f"Housemaster request processed: status={result['status']}")
+        logger.info("Housemaster request processed: status=%s", result['status'])
 
         return jsonify(result), 200
 
+    except ProcessorOverloaded:
+        logger.warning("Processor queue full, rejecting housemaster request")
+        return _overloaded_response()
+
+    except asyncio.TimeoutError:
+        logger.error("Housemaster request timed out")
+        return _timeout_response()
+
     except Exception as e:
-        logger.error(f"Error processing housemaster request: {e}", exc_info=True)
+        logger.error("Error processing housemaster request: %s", e, exc_info=True)
         return jsonify({
             'status': 'error',
             'message': 'An error occurred processing your request.'
@@ -204,7 +453,7 @@ def process_housemaster_request():
 
 
 @app.errorhandler(404)
-def not_found(error):
+async def not_found(error):
     """Handle 404 errors"""
     return jsonify({
         'status': 'error',
@@ -213,9 +462,9 @@ def not_found(error):
 
 
 @app.errorhandler(500)
-def internal_error(error):
+async def internal_error(error):
     """Handle 500 errors"""
-    logger.error(f"Internal server error: {error}")
+    logger.error("Internal server error: %s", error)
     return jsonify({
         'status': 'error',
         'message': 'Internal server error'
@@ -228,7 +477,7 @@ if __name__ == '__main__':
     logger.info("=" * 70)
     logger.info("Michaelhouse Leave API - PRODUCTION MODE")
     logger.info("=" * 70)
-    logger.info(f"Starting on http://0.0.0.0:{port}")
+    logger.info("Starting on http://0.0.0.0:%s", port)
     logger.info("")
     logger.info("Endpoints:")
     logger.info("  GET  /health - Health check")
@@ -238,6 +487,13 @@ if __name__ == '__main__':
     logger.info("Database Tools: %s", "PRODUCTION" if hasattr(processor.tools, '_get_connection') else "PLACEHOLDER")
     logger.info("=" * 70)
 
-    # Run in development mode
-    # For production, use: gunicorn -w 4 -b 0.0.0.0:8090 api_production:app
-    app.run(host='0.0.0.0', port=port, debug=False)
+    # Serve with Uvicorn worker processes (the app is loaded by import string
+    # so each worker builds its own). Under systemd, gunicorn with the uvicorn
+    # worker class is used instead (see deploy/leave-api.service).
+    import uvicorn
+    uvicorn.run(
+        'api_production:app',
+        host='0.0.0.0',
+        port=port,
+        workers=int(os.getenv('WORKERS', '4'))
+    )
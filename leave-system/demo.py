@@ -4,9 +4,8 @@ Demo script for Michaelhouse Leave System
 Shows how the system processes leave requests from both channels
 """
 
-import sys
-from pathlib import Path
-sys.path.insert(0, str(Path(__file__).parent))
+import argparse
+import time
 
 from processors.leave_processor import LeaveProcessor
 try:
@@ -16,16 +15,17 @@ except ImportError:
     PlaceholderEmailBridge = None
     EmailLeaveHandler = None
 
+# One processor shared by every demo, so it is only initialized once
+PROCESSOR = LeaveProcessor()
 
-def demo_whatsapp_request():
+
+def demo_whatsapp_request(processor: LeaveProcessor = PROCESSOR):
     """Demonstrate WhatsApp leave request processing"""
 
     print("\n" + "="*70)
     print("DEMO 1: WhatsApp Leave Request (Parent)")
     print("="*70)
 
-    processor = LeaveProcessor()
-
     # Simulate a WhatsApp message from a parent
     message = """Hi, I'd like to request overnight leave for James this Saturday 8th February.
 Please let me know if this is approved."""
@@ -48,15 +48,13 @@ Please let me know if this is approved."""
     print("-" * 70)
 
 
-def demo_email_request():
+def demo_email_request(processor: LeaveProcessor = PROCESSOR):
     """Demonstrate Email leave request processing"""
 
     print("\n" + "="*70)
     print("DEMO 2: Email Leave Request (Parent)")
     print("="*70)
 
-    processor = LeaveProcessor()
-
     # Simulate an email from a parent
     email_body = """Dear Leave System,
 
@@ -83,15 +81,13 @@ Jane Doe"""
     print("-" * 70)
 
 
-def demo_closed_weekend():
+def demo_closed_weekend(processor: LeaveProcessor = PROCESSOR):
     """Demonstrate closed weekend handling (E/D block)"""
 
     print("\n" + "="*70)
     print("DEMO 3: Closed Weekend - Special Leave Required (E Block)")
     print("="*70)
 
-    processor = LeaveProcessor()
-
     # Request for first weekend of term (closed for E block)
     message = """Please approve overnight leave for Michael (67890) on 18th January 2025.
 This is the first weekend of term."""
@@ -114,15 +110,13 @@ This is the first weekend of term."""
     print("-" * 70)
 
 
-def demo_insufficient_balance():
+def demo_insufficient_balance(processor: LeaveProcessor = PROCESSOR):
     """Demonstrate insufficient balance rejection"""
 
     print("\n" + "="*70)
     print("DEMO 4: Insufficient Balance - Rejection")
     print("="*70)
 
-    processor = LeaveProcessor()
-
     # Note: Mock data shows student 67890 has 2 overnight leaves
     # We'll simulate they've used them all
 
@@ -147,15 +141,13 @@ def demo_insufficient_balance():
     print("-" * 70)
 
 
-def demo_housemaster_query():
+def demo_housemaster_query(processor: LeaveProcessor = PROCESSOR):
     """Demonstrate Housemaster balance query"""
 
     print("\n" + "="*70)
     print("DEMO 5: Housemaster Balance Query")
     print("="*70)
 
-    processor = LeaveProcessor()
-
     message = "What is the leave balance for student 12345?"
     sender_email = "hm.finningley@michaelhouse.org"
 
@@ -175,15 +167,13 @@ def demo_housemaster_query():
     print("-" * 70)
 
 
-def demo_housemaster_cancellation():
+def demo_housemaster_cancellation(processor: LeaveProcessor = PROCESSOR):
     """Demonstrate Housemaster leave cancellation"""
 
     print("\n" + "="*70)
     print("DEMO 6: Housemaster Leave Cancellation")
     print("="*70)
 
-    processor = LeaveProcessor()
-
     message = "Please cancel the leave for student 12345 because of academic concerns."
     sender_email = "hm.finningley@michaelhouse.org"
 
@@ -203,15 +193,13 @@ def demo_housemaster_cancellation():
     print("-" * 70)
 
 
-def demo_day_leave():
+def demo_day_leave(processor: LeaveProcessor = PROCESSOR):
     """Demonstrate unlimited day leave approval"""
 
     print("\n" + "="*70)
     print("DEMO 7: Day Leave - Automatic Approval (Unlimited)")
     print("="*70)
 
-    processor = LeaveProcessor()
-
     message = "Can James have day leave this Sunday to visit family?"
     sender_phone = "27603174174"
 
@@ -231,8 +219,21 @@ def demo_day_leave():
     print("-" * 70)
 
 
-def main():
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--non-interactive', action='store_true',
+                        help="don't wait for Enter between demos")
+    parser.add_argument('--only', type=int, metavar='N',
+                        help='run only demo number N')
+    parser.add_argument('--repeat', type=int, default=1, metavar='K',
+                        help='run each demo K times (default 1)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Run all demos"""
+    args = parse_args(argv)
 
     print("\n" + "="*70)
     print(" MICHAELHOUSE LEAVE SYSTEM - DEMONSTRATION")
@@ -251,9 +252,18 @@ def main():
     ]
 
     for i, (name, demo_func) in enumerate(demos, 1):
+        if args.only is not None and i != args.only:
+            continue
+
         try:
-            demo_func()
-            input(f"\n[Press Enter to continue to Demo {i+1}/{len(demos)}...]")
+            for _ in range(args.repeat):
+                t0 = time.perf_counter_ns()
+                demo_func(PROCESSOR)
+                elapsed_ms = (time.perf_counter_ns() - t0) / 1e6
+                print(f"\n[TIMING] Demo {i} ({name}): {elapsed_ms:.2f} ms")
+
+            if not args.non_interactive:
+                input(f"\n[Press Enter to continue to Demo {i+1}/{len(demos)}...]")
         except KeyboardInterrupt:
             print("\n\nDemo interrupted by user.")
             break
@@ -6,14 +6,59 @@ NOTE: This is a placeholder implementation
 In production, integrate with actual email service (IMAP/SMTP, Gmail API, etc.)
 """
 
+import asyncio
 import imaplib
+import re
 import smtplib
+import sys
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email import message_from_bytes
+from email import policy
+from email.parser import BytesHeaderParser, BytesParser
+from email.utils import parseaddr
+from pathlib import Path
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from processors.leave_processor import LeaveProcessor
+
+# Unread mail is fetched in two passes: the headers we use for every message,
+# then only the text-bearing section of each body. Attachments after the first
+# MIME part are never downloaded. BODY.PEEK leaves \Seen for mark_as_read.
+_FETCH_HEADERS = (
+    '(BODY.PEEK[HEADER.FIELDS (FROM SUBJECT DATE MIME-VERSION CONTENT-TYPE CONTENT-TRANSFER-ENCODING)])'
+)
+# Single-part text message: the whole body
+_FETCH_TEXT = '(BODY.PEEK[TEXT])'
+# Multipart message: the first part and its MIME headers (text/plain, or the
+# multipart/alternative holding it)
+_FETCH_FIRST_PART = '(BODY.PEEK[1.MIME] BODY.PEEK[1])'
+# Messages are addressed by UID: the session is long-lived, and an EXPUNGE
+# delivered by any command renumbers sequence numbers under us
+_FETCH_START_RE = re.compile(rb'^\d+ \(')
+_FETCH_UID_RE = re.compile(rb'UID (\d+)')
+_FETCH_SECTION_RE = re.compile(rb'BODY\[([^\]]*)\]')
+
+_header_parser = BytesHeaderParser(policy=policy.default)
+_body_parser = BytesParser(policy=policy.default)
+
+# Housemaster emails come from hm.* addresses or mention housemaster in the subject
+_HM_SENDER_RE = re.compile(r'\bhm\.', re.I)
+_HM_SUBJECT_RE = re.compile(r'housemaster', re.I)
+
+
+def _text_content(part: Any) -> str:
+    """Decode a text part using its declared charset"""
+    try:
+        return part.get_content()
+    except LookupError:
+        # Unknown charset: fall back to lenient UTF-8
+        return part.get_payload(decode=True).decode('utf-8', errors='ignore')
+
 
 class EmailBridge:
     """
@@ -48,6 +93,13 @@ class EmailBridge:
         self.port_imap = port_imap
         self.port_smtp = port_smtp
 
+        # Sessions are opened on first use and reused across operations;
+        # IMAP and SMTP clients are not thread-safe, so each has a lock
+        self._imap: Optional[imaplib.IMAP4_SSL] = None
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._imap_lock = threading.Lock()
+        self._smtp_lock = threading.Lock()
+
     def connect_imap(self) -> Optional[imaplib.IMAP4_SSL]:
         """
         Connect to IMAP server
@@ -63,6 +115,66 @@ class EmailBridge:
             print(f"[EMAIL] Failed to connect to IMAP: {e}")
             return None
 
+    def _get_imap(self) -> Optional[imaplib.IMAP4_SSL]:
+        """Return the cached IMAP session with inbox selected, reconnecting if it dropped"""
+        if self._imap is not None:
+            try:
+                self._imap.noop()
+                return self._imap
+            except (imaplib.IMAP4.abort, imaplib.IMAP4.error, OSError):
+                self._drop_imap()
+
+        mail = self.connect_imap()
+        if mail:
+            try:
+                mail.select('inbox')
+            except (imaplib.IMAP4.error, OSError) as e:
+                print(f"[EMAIL] Failed to select inbox: {e}")
+                return None
+            self._imap = mail
+        return mail
+
+    def _drop_imap(self):
+        """Forget the cached IMAP session, logging out if still possible"""
+        mail, self._imap = self._imap, None
+        if mail is not None:
+            try:
+                mail.logout()
+            except Exception:
+                pass
+
+    def _get_smtp(self) -> smtplib.SMTP:
+        """Return the cached SMTP session, reconnecting if it dropped"""
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._drop_smtp()
+
+        server = smtplib.SMTP(self.smtp_server, self.port_smtp)
+        server.starttls()
+        server.login(self.email_address, self.password)
+        self._smtp = server
+        return server
+
+    def _drop_smtp(self):
+        """Forget the cached SMTP session, quitting if still possible"""
+        server, self._smtp = self._smtp, None
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+    def close(self):
+        """Log out of the IMAP and SMTP sessions"""
+        with self._imap_lock:
+            self._drop_imap()
+        with self._smtp_lock:
+            self._drop_smtp()
+
     def fetch_unread_emails(self) -> List[Dict[str, Any]]:
         """
         Fetch unread emails from inbox
@@ -70,15 +182,18 @@ class EmailBridge:
         Returns:
             List of email dictionaries with sender, subject, body, date
         """
-        mail = self.connect_imap()
-        if not mail:
-            return []
+        with self._imap_lock:
+            mail = self._get_imap()
+            if not mail:
+                return []
 
-        try:
-            mail.select('inbox')
+            return self._fetch_unread(mail)
 
+    def _fetch_unread(self, mail: imaplib.IMAP4_SSL) -> List[Dict[str, Any]]:
+        """Fetch unread emails over an open session (caller holds the IMAP lock)"""
+        try:
             # Search for unread emails
-            status, messages = mail.search(None, 'UNSEEN')
+            status, messages = mail.uid('SEARCH', None, 'UNSEEN')
 
             if status != 'OK':
                 return []
@@ -86,36 +201,47 @@ class EmailBridge:
             email_ids = messages[0].split()
             emails = []
 
-            for email_id in email_ids:
-                # Fetch email data
-                status, msg_data = mail.fetch(email_id, '(RFC822)')
+            if not email_ids:
+                return emails
 
-                if status != 'OK':
-                    continue
+            # Pass 1: headers for all unread emails in one round-trip
+            status, msg_data = mail.uid('FETCH', b','.join(email_ids), _FETCH_HEADERS)
 
-                # Parse email
-                msg = message_from_bytes(msg_data[0][1])
+            if status != 'OK':
+                return emails
+
+            raw_headers = {
+                email_id: sections.get('HEADER', b'')
+                for email_id, sections in self._split_fetch_response(msg_data).items()
+            }
+            headers = {
+                email_id: _header_parser.parsebytes(raw)
+                for email_id, raw in raw_headers.items()
+            }
+
+            # Pass 2: fetch only the section that can hold a text body
+            single_part = [i for i, h in headers.items() if h.get_content_maintype() == 'text']
+            multipart = [i for i, h in headers.items() if h.get_content_maintype() == 'multipart']
+            bodies = {}
+
+            for ids, items in ((single_part, _FETCH_TEXT), (multipart, _FETCH_FIRST_PART)):
+                if not ids:
+                    continue
+                status, msg_data = mail.uid('FETCH', b','.join(ids), items)
+                if status == 'OK':
+                    bodies.update(self._split_fetch_response(msg_data))
 
+            for email_id, msg in headers.items():
                 # Extract relevant fields
-                from_addr = msg.get('From', '')
-                subject = msg.get('Subject', '')
-                date_str = msg.get('Date', '')
+                from_addr = str(msg.get('From', ''))
+                subject = str(msg.get('Subject', ''))
+                date_str = str(msg.get('Date', ''))
 
                 # Extract sender email from "Name <email@domain.com>" format
-                if '<' in from_addr:
-                    sender_email = from_addr.split('<')[1].split('>')[0]
-                else:
-                    sender_email = from_addr
-
-                # Extract body
-                body = ""
-                if msg.is_multipart():
-                    for part in msg.walk():
-                        if part.get_content_type() == "text/plain":
-                            body = part.get_payload(decode=True).decode('utf-8', errors='ignore')
-                            break
-                else:
-                    body = msg.get_payload(decode=True).decode('utf-8', errors='ignore')
+                sender_email = parseaddr(from_addr)[1] or from_addr
+
+                # Extract body (empty for emails with no text part)
+                body = self._extract_body(raw_headers[email_id], bodies.get(email_id, {}))
 
                 emails.append({
                     'id': email_id.decode(),
@@ -126,20 +252,67 @@ class EmailBridge:
                     'timestamp': datetime.now()
                 })
 
-            mail.close()
-            mail.logout()
-
             return emails
 
         except Exception as e:
             print(f"[EMAIL] Error fetching emails: {e}")
-            try:
-                mail.close()
-                mail.logout()
-            except:
-                pass
+            # Start from a fresh session next time
+            self._drop_imap()
             return []
 
+    @staticmethod
+    def _split_fetch_response(msg_data: List[Any]) -> Dict[bytes, Dict[str, bytes]]:
+        """
+        Split a multi-message UID FETCH response into {uid: {section: literal}}
+
+        Sections are keyed by what is inside BODY[...], with any
+        HEADER.FIELDS section keyed as 'HEADER'.
+        """
+        messages: Dict[bytes, Dict[str, bytes]] = {}
+        current = None
+        for item in msg_data:
+            # (meta, literal) tuples, one per section, plus a closing bytes
+            # item per message; the UID may be in either
+            meta = item[0] if isinstance(item, tuple) else item
+            if not isinstance(meta, bytes):
+                continue
+
+            if _FETCH_START_RE.match(meta):
+                current = {}
+            if current is None:
+                continue
+
+            uid = _FETCH_UID_RE.search(meta)
+            if uid:
+                messages[uid.group(1)] = current
+
+            if isinstance(item, tuple):
+                section = _FETCH_SECTION_RE.search(meta)
+                if section:
+                    key = section.group(1).decode()
+                    if key.startswith('HEADER'):
+                        key = 'HEADER'
+                    current[key] = item[1]
+
+        return messages
+
+    @staticmethod
+    def _extract_body(raw_headers: bytes, sections: Dict[str, bytes]) -> str:
+        """Return the text body from the sections fetched in pass 2"""
+        if 'TEXT' in sections:
+            # Single-part text message: rebuild it so the transfer encoding applies
+            msg = _body_parser.parsebytes(raw_headers + sections['TEXT'])
+            return _text_content(msg)
+
+        if '1' in sections:
+            # First part of a multipart message, with its own MIME headers.
+            # Take the longest text/plain part so a short signature part loses.
+            part = _body_parser.parsebytes(sections.get('1.MIME', b'') + sections['1'])
+            texts = [_text_content(sub) for sub in part.walk() if sub.get_content_type() == "text/plain"]
+            return max(texts, key=len, default="")
+
+        return ""
+
     def send_email(
         self,
         to_address: str,
@@ -173,12 +346,14 @@ class EmailBridge:
             text_part = MIMEText(body, 'plain')
             msg.attach(text_part)
 
-            # Send via SMTP
-            server = smtplib.SMTP(self.smtp_server, self.port_smtp)
-            server.starttls()
-            server.login(self.email_address, self.password)
-            server.send_message(msg)
-            server.quit()
+            # Send via the shared SMTP session
+            with self._smtp_lock:
+                try:
+                    self._get_smtp().send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # Session went away between the check and the send; retry once
+                    self._drop_smtp()
+                    self._get_smtp().send_message(msg)
 
             print(f"[EMAIL] Sent to {to_address}")
             return True
@@ -192,24 +367,38 @@ class EmailBridge:
         Mark an email as read
 
         Args:
-            email_id: Email ID to mark
+            email_id: Email UID to mark
 
         Returns:
             True if successful
         """
-        mail = self.connect_imap()
-        if not mail:
-            return False
+        return self.mark_many_as_read([email_id])
 
-        try:
-            mail.select('inbox')
-            mail.store(email_id.encode(), '+FLAGS', '\\Seen')
-            mail.close()
-            mail.logout()
+    def mark_many_as_read(self, email_ids: List[str]) -> bool:
+        """
+        Mark several emails as read with a single IMAP STORE
+
+        Args:
+            email_ids: Email UIDs to mark
+
+        Returns:
+            True if successful
+        """
+        if not email_ids:
             return True
-        except Exception as e:
-            print(f"[EMAIL] Failed to mark as read: {e}")
-            return False
+
+        with self._imap_lock:
+            mail = self._get_imap()
+            if not mail:
+                return False
+
+            try:
+                mail.uid('STORE', ','.join(email_ids).encode(), '+FLAGS', '\\Seen')
+                return True
+            except Exception as e:
+                print(f"[EMAIL] Failed to mark as read: {e}")
+                self._drop_imap()
+                return False
 
 
 class EmailLeaveHandler:
@@ -218,26 +407,44 @@ class EmailLeaveHandler:
     Integrates with LeaveProcessor
     """
 
-    def __init__(self, email_bridge: EmailBridge):
+    def __init__(
+        self,
+        email_bridge: EmailBridge,
+        concurrency: int = 10,
+        processor: Optional[LeaveProcessor] = None
+    ):
         """
         Initialize email leave handler
 
         Args:
             email_bridge: Configured EmailBridge instance
+            concurrency: Maximum emails processed at the same time (only
+                with thread-safe tools; one sender's emails always run in order)
+            processor: LeaveProcessor to use (a new one is created if omitted)
         """
         self.email_bridge = email_bridge
+        self.concurrency = concurrency
+        self.processor = processor if processor is not None else LeaveProcessor()
 
     def process_incoming_emails(self):
         """
         Main loop: fetch and process unread emails
         """
-        from ..processors.leave_processor import LeaveProcessor
+        asyncio.run(self.process_incoming_emails_async())
 
-        processor = LeaveProcessor()
+    async def process_incoming_emails_async(self):
+        """
+        Fetch unread emails and process them concurrently
 
+        Emails are grouped by sender and each group runs in order, so a parent
+        who writes twice can't pass the balance check twice. Up to
+        ``concurrency`` emails from different senders are in flight at once,
+        so one email's processing overlaps with another's SMTP send and IMAP
+        update. Tools that are not thread-safe get a single group.
+        """
         print("[EMAIL HANDLER] Checking for new emails...")
 
-        emails = self.email_bridge.fetch_unread_emails()
+        emails = await asyncio.to_thread(self.email_bridge.fetch_unread_emails)
 
         if not emails:
             print("[EMAIL HANDLER] No new emails")
@@ -245,41 +452,89 @@ class EmailLeaveHandler:
 
         print(f"[EMAIL HANDLER] Found {len(emails)} unread email(s)")
 
+        groups: Dict[Optional[str], List[Dict[str, Any]]] = {}
         for email_data in emails:
+            groups.setdefault(self._group_key(email_data['from']), []).append(email_data)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        group_results = await asyncio.gather(*(
+            self._process_group(batch, semaphore)
+            for batch in groups.values()
+        ))
+        results = [r for batch_results in group_results for r in batch_results]
+
+        # Mark every answered email as read in one STORE
+        processed_ids = [r for r in results if not isinstance(r, BaseException)]
+        await asyncio.to_thread(self.email_bridge.mark_many_as_read, processed_ids)
+
+        # Surface the first failure once the successful emails are marked
+        for r in results:
+            if isinstance(r, BaseException):
+                raise r
+
+    def _group_key(self, sender: str) -> Optional[str]:
+        """Key of the group an email is processed in (None: one group for all)"""
+        if getattr(self.processor.tools, 'thread_safe', False) is not True:
+            return None
+        return sender.lower()
+
+    async def _process_group(
+        self,
+        batch: List[Dict[str, Any]],
+        semaphore: asyncio.Semaphore
+    ) -> List[Any]:
+        """Process one group's emails in order; returns each email's ID or exception"""
+        results: List[Any] = []
+        for email_data in batch:
+            try:
+                results.append(await self._process_email(email_data, semaphore))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    async def _process_email(
+        self,
+        email_data: Dict[str, Any],
+        semaphore: asyncio.Semaphore
+    ) -> str:
+        """Process one email and send the response; returns the email ID"""
+        async with semaphore:
             print(f"\n[EMAIL HANDLER] Processing email from {email_data['from']}")
             print(f"                Subject: {email_data['subject']}")
 
             # Determine if it's a parent or housemaster request
-            is_housemaster = 'hm.' in email_data['from'] or 'housemaster' in email_data['subject'].lower()
+            is_housemaster = bool(
+                _HM_SENDER_RE.search(email_data['from'])
+                or _HM_SUBJECT_RE.search(email_data['subject'])
+            )
 
             if is_housemaster:
                 # Process housemaster request
-                result = processor.process_housemaster_request(
-                    message_text=email_data['body'],
-                    sender_identifier=email_data['from'],
-                    channel='email'
-                )
+                process = self.processor.process_housemaster_request
             else:
                 # Process parent leave request
-                result = processor.process_parent_request(
-                    message_text=email_data['body'],
-                    sender_identifier=email_data['from'],
-                    channel='email'
-                )
+                process = self.processor.process_parent_request
+
+            result = await asyncio.to_thread(
+                process,
+                message_text=email_data['body'],
+                sender_identifier=email_data['from'],
+                channel='email'
+            )
 
             # Send response
             response_subject = self._generate_subject(result, email_data['subject'])
-            self.email_bridge.send_email(
+            await asyncio.to_thread(
+                self.email_bridge.send_email,
                 to_address=email_data['from'],
                 subject=response_subject,
                 body=result['message']
             )
 
-            # Mark as read
-            self.email_bridge.mark_as_read(email_data['id'])
-
             print(f"[EMAIL HANDLER] Response sent: {result['status']}")
 
+            return email_data['id']
+
     def _generate_subject(self, result: Dict[str, Any], original_subject: str) -> str:
         """Generate appropriate response subject"""
 
@@ -336,6 +591,15 @@ class PlaceholderEmailBridge(EmailBridge):
 
         return True
 
+    def mark_many_as_read(self, email_ids: List[str]) -> bool:
+        """Simulate marking emails as read by removing them from the mock inbox"""
+        read = set(email_ids)
+        self.mock_inbox = [e for e in self.mock_inbox if e['id'] not in read]
+        return True
+
+    def close(self):
+        """Nothing to close for the placeholder"""
+
     def add_mock_email(
         self,
         from_address: str,
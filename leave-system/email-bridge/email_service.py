@@ -5,18 +5,29 @@ Monitors IMAP inbox for leave requests and sends responses via SMTP
 """
 
 import imaplib
+import re
+import select
 import smtplib
+import socket
+import ssl
 import email
+from email import policy
+from email.message import EmailMessage
+from email.parser import BytesHeaderParser, BytesParser
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.header import decode_header
 import time
+import functools
 import os
 import sys
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from pathlib import Path
+from queue import LifoQueue
 from datetime import datetime
 import logging
-from typing import Optional, Dict, Any
+from typing import AbstractSet, Optional, Dict, Any, FrozenSet, Iterator, List, Set, Tuple
 from dotenv import load_dotenv
 
 # Add parent directory to path
@@ -39,6 +50,70 @@ logging.basicConfig(
 )
 logger = logging.getLogger('email_service')
 
+# Re-issue IDLE before servers drop it (Gmail ends IDLE after ~10 minutes)
+IDLE_REFRESH_SECONDS = 9 * 60
+
+# Unseen mail worth answering; bounces are skipped server-side so we never
+# reply to a delivery failure
+SEARCH_CRITERIA = ('UNSEEN', 'NOT', 'FROM', '"mailer-daemon"')
+
+# Each email is fetched in two steps: the headers needed to route and decode
+# it, then only its text (the first MIME part of a multipart message, so
+# attachments are never downloaded). PEEK leaves \Seen for mark_as_read.
+FETCH_HEADERS = (
+    '(BODY.PEEK[HEADER.FIELDS (FROM SUBJECT DATE MIME-VERSION CONTENT-TYPE CONTENT-TRANSFER-ENCODING)])'
+)
+FETCH_TEXT = '(BODY.PEEK[TEXT])'
+FETCH_FIRST_PART = '(BODY.PEEK[1.MIME] BODY.PEEK[1])'
+_FETCH_SECTION_RE = re.compile(rb'BODY\[([^\]]*)\]')
+_FETCH_START_RE = re.compile(rb'^\d+ \(')
+_FETCH_UID_RE = re.compile(rb'UID (\d+)')
+# UIDs per FETCH/STORE command, keeping command lines well under server limits
+FETCH_BATCH_SIZE = 200
+
+_header_parser = BytesHeaderParser(policy=policy.default)
+_body_parser = BytesParser(policy=policy.default)
+
+# Addresses that mark a sender as a housemaster without a table lookup: the
+# local part starts with "hm." or "housemaster" (hm.finningley@...), so
+# addresses that merely contain them (parent@bohm.co.za) stay parents
+_HM_SENDER_RE = re.compile(r'(?:hm\.|housemaster)', re.IGNORECASE)
+
+# Seconds before the registered housemaster addresses are reloaded
+HOUSEMASTER_REFRESH_SECONDS = 60 * 60
+
+
+def classify_email(sender_email: str, housemaster_emails: AbstractSet[str] = frozenset()) -> str:
+    """
+    Return the route ('housemaster' or 'parent') for an email
+
+    The sender alone decides: registered housemaster addresses (lowercased)
+    and addresses starting hm. are housemasters, everyone else is a parent.
+    Words in the subject or body never change the route, so a parent asking
+    to "cancel" a request still reaches the parent processor.
+    """
+    if sender_email.lower() in housemaster_emails or _HM_SENDER_RE.match(sender_email):
+        return 'housemaster'
+    return 'parent'
+
+
+@functools.lru_cache(maxsize=2048)
+def _decode_subject_cached(subject: str) -> str:
+    """Decode an RFC 2047 encoded subject (reply threads repeat the same one)"""
+    decoded_parts = decode_header(subject)
+    decoded_subject = ""
+
+    for part, encoding in decoded_parts:
+        if isinstance(part, bytes):
+            try:
+                decoded_subject += part.decode(encoding or 'utf-8')
+            except:
+                decoded_subject += part.decode('utf-8', errors='ignore')
+        else:
+            decoded_subject += part
+
+    return decoded_subject
+
 
 class EmailLeaveService:
     """Email monitoring service for leave requests"""
@@ -54,21 +129,62 @@ class EmailLeaveService:
         self.email_password = os.getenv('LEAVE_EMAIL_PASSWORD')
 
         # Monitoring configuration
-        self.check_interval = int(os.getenv('EMAIL_CHECK_INTERVAL', '60'))  # seconds
+        self.check_interval = int(os.getenv('EMAIL_CHECK_INTERVAL', '60'))  # seconds (polling fallback)
+        self.use_idle = os.getenv('EMAIL_USE_IDLE', 'true').lower() == 'true'
+        self._idle_healthy = False
+
+        # Reused SMTP sessions; each slot holds a logged-in session or None
+        # until first use. Keep the size within the provider's connection limit.
+        self.smtp_pool_size = int(os.getenv('SMTP_POOL_SIZE', '4'))
+        self._smtp_pool: "LifoQueue[Optional[smtplib.SMTP]]" = LifoQueue()
+        for _ in range(self.smtp_pool_size):
+            self._smtp_pool.put(None)
         self.mark_as_read = os.getenv('EMAIL_MARK_AS_READ', 'true').lower() == 'true'
 
+        # Senders whose emails are processed and answered at once (IMAP
+        # fetches stay on the calling thread because imaplib connections are
+        # not thread-safe). One sender's emails always run in order, since a
+        # parent who writes twice would otherwise pass the balance check twice.
+        self.concurrency = int(os.getenv('EMAIL_CONCURRENCY', '4'))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix='email-worker'
+        )
+
+        # Emails handed to the workers but not yet marked as read, by UID,
+        # each mapped to its group's future (which returns the answered UIDs).
+        # Finished workers poke _wake_w so an IDLE wait can return and let the
+        # IMAP thread set their \Seen flags.
+        self._in_flight: Dict[bytes, "Future[Set[bytes]]"] = {}
+        # The batch still in flight for each group key, and whether emails
+        # were held back behind one of them (picked up once it finishes)
+        self._in_flight_groups: Dict[Optional[str], "Future[Set[bytes]]"] = {}
+        self._deferred = False
+        # Set when a finished email went unanswered (it stays unseen and is
+        # retried after check_interval)
+        self._retry_failed = False
+
+        # Polling connection, kept open between check_inbox calls
+        self._mail: Optional[imaplib.IMAP4_SSL] = None
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+
         # Initialize leave processor
         try:
             logger.info("Initializing leave processor with database tools...")
             tools = DatabaseTools()
-            self.processor = LeaveProcessor()
-            self.processor.tools = tools
+            self.processor = LeaveProcessor(tools=tools)
             logger.info("✓ Database tools initialized")
         except Exception as e:
             logger.warning(f"Failed to initialize database tools: {e}")
             logger.info("Using placeholder tools")
             self.processor = LeaveProcessor()
 
+        # Registered housemaster addresses for routing
+        self.housemaster_emails: FrozenSet[str] = frozenset()
+        self._housemasters_loaded_at = 0.0
+        self.refresh_housemasters()
+
         # Validate configuration
         if not self.email_address or not self.email_password:
             raise ValueError("LEAVE_EMAIL and LEAVE_EMAIL_PASSWORD must be set in environment")
@@ -84,6 +200,30 @@ class EmailLeaveService:
             logger.error(f"Failed to connect to IMAP: {e}")
             raise
 
+    def _get_imap(self) -> imaplib.IMAP4_SSL:
+        """Return the polling connection with INBOX selected, reconnecting if it died"""
+        if self._mail is not None:
+            try:
+                if self._mail.noop()[0] == 'OK':
+                    return self._mail
+            except (imaplib.IMAP4.error, OSError):
+                pass
+            self._drop_imap()
+
+        mail = self.connect_imap()
+        mail.select('INBOX')
+        self._mail = mail
+        return mail
+
+    def _drop_imap(self) -> None:
+        """Log out of the polling connection, ignoring errors from a dead one"""
+        mail, self._mail = self._mail, None
+        if mail is not None:
+            try:
+                mail.logout()
+            except Exception:
+                pass
+
     def connect_smtp(self) -> smtplib.SMTP:
         """Connect to SMTP server"""
         try:
@@ -96,24 +236,92 @@ class EmailLeaveService:
             logger.error(f"Failed to connect to SMTP: {e}")
             raise
 
-    def decode_email_subject(self, subject: str) -> str:
-        """Decode email subject from various encodings"""
-        decoded_parts = decode_header(subject)
-        decoded_subject = ""
+    @staticmethod
+    def _quit_smtp(smtp: smtplib.SMTP) -> None:
+        """Close an SMTP session, ignoring errors from a dead connection"""
+        try:
+            smtp.quit()
+        except Exception:
+            pass
 
-        for part, encoding in decoded_parts:
-            if isinstance(part, bytes):
+    @contextmanager
+    def _smtp_session(self) -> Iterator[smtplib.SMTP]:
+        """Borrow a live SMTP session from the pool, connecting if needed"""
+        smtp = self._smtp_pool.get()
+        try:
+            if smtp is not None:
                 try:
-                    decoded_subject += part.decode(encoding or 'utf-8')
-                except:
-                    decoded_subject += part.decode('utf-8', errors='ignore')
-            else:
-                decoded_subject += part
+                    alive = smtp.noop()[0] == 250
+                except (smtplib.SMTPException, OSError):
+                    alive = False
+                if not alive:
+                    self._quit_smtp(smtp)
+                    smtp = None
+
+            if smtp is None:
+                smtp = self.connect_smtp()
+
+            yield smtp
+
+        except Exception:
+            # Don't hand a session in an unknown state to the next sender
+            if smtp is not None:
+                self._quit_smtp(smtp)
+                smtp = None
+            raise
+
+        finally:
+            self._smtp_pool.put(smtp)
 
-        return decoded_subject
+    def close(self) -> None:
+        """Stop the worker pool and close pooled IMAP/SMTP sessions"""
+        self._executor.shutdown(wait=True)
+        self._drop_imap()
+        self._wake_r.close()
+        self._wake_w.close()
+
+        for _ in range(self.smtp_pool_size):
+            smtp = self._smtp_pool.get()
+            if smtp is not None:
+                self._quit_smtp(smtp)
+            self._smtp_pool.put(None)
+
+    def refresh_housemasters(self) -> None:
+        """Reload the registered housemaster addresses from the tools backend"""
+        self._housemasters_loaded_at = time.monotonic()
+
+        load = getattr(self.processor.tools, 'housemaster_emails', None)
+        if load is None:
+            # Placeholder tools: routing falls back to hm.* addresses
+            return
+
+        try:
+            self.housemaster_emails = frozenset(load())
+            logger.info(f"Loaded {len(self.housemaster_emails)} housemaster address(es)")
+        except Exception as e:
+            logger.warning(f"Failed to load housemaster addresses: {e}")
+
+    def decode_email_subject(self, subject: str) -> str:
+        """Decode email subject from various encodings"""
+        # Plain subjects (and ones the parser already decoded) have no encoded words
+        if '=?' not in subject:
+            return subject
+
+        return _decode_subject_cached(subject)
 
     def extract_email_body(self, msg: email.message.Message) -> str:
         """Extract plain text body from email message"""
+        if isinstance(msg, EmailMessage):
+            # Jump straight to the preferred text/plain part; HTML alternatives
+            # and attachments are never decoded
+            part = msg.get_body(preferencelist=('plain',))
+            if part is not None:
+                try:
+                    return part.get_content().strip()
+                except LookupError:
+                    # Unknown charset: the lenient decode below handles it
+                    pass
+
         body = ""
 
         if msg.is_multipart():
@@ -144,8 +352,6 @@ class EmailLeaveService:
     def send_email_response(self, to_address: str, subject: str, body: str) -> bool:
         """Send email response"""
         try:
-            smtp = self.connect_smtp()
-
             msg = MIMEMultipart()
             msg['From'] = self.email_address
             msg['To'] = to_address
@@ -153,8 +359,13 @@ class EmailLeaveService:
 
             msg.attach(MIMEText(body, 'plain'))
 
-            smtp.send_message(msg)
-            smtp.quit()
+            try:
+                with self._smtp_session() as smtp:
+                    smtp.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                # Pooled session dropped after the liveness check; retry once
+                with self._smtp_session() as smtp:
+                    smtp.send_message(msg)
 
             logger.info(f"✓ Email sent to {to_address}")
             return True
@@ -163,111 +374,443 @@ class EmailLeaveService:
             logger.error(f"Failed to send email to {to_address}: {e}")
             return False
 
-    def process_email(self, mail: imaplib.IMAP4_SSL, email_id: bytes) -> None:
-        """Process a single email"""
-        try:
-            # Fetch email
-            status, msg_data = mail.fetch(email_id, '(RFC822)')
-            if status != 'OK':
+    def fetch_email(self, mail: imaplib.IMAP4_SSL, email_id: bytes) -> Optional[Tuple[str, str, str]]:
+        """
+        Fetch and parse one email (email_id is an IMAP UID)
+
+        Returns:
+            (sender_email, subject, body), or None if the fetch failed
+        """
+        return self.fetch_emails(mail, [email_id]).get(email_id)
+
+    def fetch_emails(
+        self,
+        mail: imaplib.IMAP4_SSL,
+        email_ids: List[bytes]
+    ) -> Dict[bytes, Tuple[str, str, str]]:
+        """
+        Fetch and parse several emails by UID with batched FETCH commands
+
+        One FETCH gets every email's headers, then at most two more get the
+        text (one for single-part text emails, one for multipart), however many
+        emails there are.
+
+        Returns:
+            (sender_email, subject, body) keyed by UID; failed emails are left out
+        """
+        headers = self._fetch_sections(mail, email_ids, FETCH_HEADERS)
+
+        # Parse headers and split by how the body has to be fetched
+        parsed_headers = {}
+        single_part, multipart = [], []
+        texts: Dict[bytes, Dict[str, bytes]] = {}
+        for email_id in email_ids:
+            sections = headers.get(email_id)
+            if sections is None:
                 logger.warning(f"Failed to fetch email {email_id}")
-                return
+                continue
+
+            raw_headers = sections.get('HEADER', b'')
+            msg = _header_parser.parsebytes(raw_headers)
+            parsed_headers[email_id] = (raw_headers, msg)
+
+            # A missing Content-Type counts as text/plain; a bare attachment
+            # (application/pdf, image/*) has no text, so nothing is fetched
+            maintype = msg.get_content_maintype()
+            if maintype == 'multipart':
+                multipart.append(email_id)
+            elif maintype == 'text':
+                single_part.append(email_id)
+            else:
+                texts[email_id] = {}
 
-            # Parse email
-            raw_email = msg_data[0][1]
-            msg = email.message_from_bytes(raw_email)
+        if single_part:
+            texts.update(self._fetch_sections(mail, single_part, FETCH_TEXT))
+        if multipart:
+            texts.update(self._fetch_sections(mail, multipart, FETCH_FIRST_PART))
 
-            # Extract sender
-            from_header = msg.get('From', '')
-            sender_email = email.utils.parseaddr(from_header)[1]
+        results = {}
+        for email_id, (raw_headers, msg) in parsed_headers.items():
+            sections = texts.get(email_id)
+            if sections is None:
+                logger.warning(f"Failed to fetch email {email_id}")
+                continue
 
-            # Extract subject
-            subject = self.decode_email_subject(msg.get('Subject', 'No Subject'))
+            try:
+                # Extract sender
+                from_header = msg.get('From', '')
+                sender_email = email.utils.parseaddr(from_header)[1]
+
+                # Extract subject
+                subject = self.decode_email_subject(str(msg.get('Subject', 'No Subject')))
+
+                # Extract body
+                if 'TEXT' in sections:
+                    # Reattach the headers so the transfer encoding and charset apply
+                    body_msg = _body_parser.parsebytes(raw_headers + sections['TEXT'])
+                    body = self.extract_email_body(body_msg)
+                elif sections:
+                    body_msg = _body_parser.parsebytes(sections.get('1.MIME', b'') + sections.get('1', b''))
+                    body = self.extract_email_body(body_msg)
+                else:
+                    body = ""
 
-            # Extract body
-            body = self.extract_email_body(msg)
+            except Exception as e:
+                logger.error(f"Error parsing email {email_id}: {e}", exc_info=True)
+                continue
 
-            logger.info(f"Processing email from {sender_email}: {subject[:50]}...")
+            results[email_id] = (sender_email, subject, body)
 
-            # Determine if this is a leave request or housemaster query
-            is_housemaster = (
-                'hm.' in sender_email.lower() or
-                'housemaster' in sender_email.lower() or
-                'balance' in subject.lower() or
-                'balance' in body.lower() or
-                'cancel' in body.lower() or
-                'restrict' in body.lower()
-            )
+        return results
 
-            # Process request
-            if is_housemaster:
-                logger.info("Processing as housemaster request")
-                result = self.processor.process_housemaster_request(
-                    message_text=body,
-                    sender_identifier=sender_email,
-                    channel='email'
-                )
-            else:
-                logger.info("Processing as parent request")
-                result = self.processor.process_parent_request(
-                    message_text=body,
-                    sender_identifier=sender_email,
-                    channel='email'
-                )
-
-            # Send response
-            response_sent = self.send_email_response(
-                to_address=sender_email,
-                subject=subject,
-                body=result['message']
+    @staticmethod
+    def _fetch_sections(
+        mail: imaplib.IMAP4_SSL,
+        email_ids: List[bytes],
+        query: str
+    ) -> Dict[bytes, Dict[str, bytes]]:
+        """UID FETCH the given BODY sections; returns {uid: {section name: bytes}}"""
+        messages: Dict[bytes, Dict[str, bytes]] = {}
+
+        for i in range(0, len(email_ids), FETCH_BATCH_SIZE):
+            uid_set = b','.join(email_ids[i:i + FETCH_BATCH_SIZE])
+            status, msg_data = mail.uid('FETCH', uid_set, query)
+            if status != 'OK':
+                logger.warning(f"Failed to fetch emails {uid_set!r}")
+                continue
+
+            # Responses arrive as (meta, literal) tuples, one per section, with
+            # a closing bytes item per message; the UID may be in either
+            current: Optional[Dict[str, bytes]] = None
+            for item in msg_data:
+                meta = item[0] if isinstance(item, tuple) else item
+                if not isinstance(meta, bytes):
+                    continue
+
+                if _FETCH_START_RE.match(meta):
+                    current = {}
+                if current is None:
+                    continue
+
+                uid = _FETCH_UID_RE.search(meta)
+                if uid:
+                    messages[uid.group(1)] = current
+
+                if isinstance(item, tuple):
+                    section = _FETCH_SECTION_RE.search(meta)
+                    if section:
+                        key = section.group(1).decode()
+                        current['HEADER' if key.startswith('HEADER') else key] = item[1]
+
+        return messages
+
+    def handle_email(self, sender_email: str, subject: str, body: str) -> bool:
+        """
+        Process a parsed email and send the response (safe to run in a worker thread)
+
+        Returns:
+            True if the response was sent
+        """
+        logger.info(f"Processing email from {sender_email}: {subject[:50]}...")
+
+        # Determine if this is a leave request or housemaster query
+        route = classify_email(sender_email, self.housemaster_emails)
+
+        # Process request
+        if route == 'housemaster':
+            logger.info("Processing as housemaster request")
+            result = self.processor.process_housemaster_request(
+                message_text=body,
+                sender_identifier=sender_email,
+                channel='email'
+            )
+        else:
+            logger.info("Processing as parent request")
+            result = self.processor.process_parent_request(
+                message_text=body,
+                sender_identifier=sender_email,
+                channel='email'
             )
 
-            if response_sent:
-                logger.info(f"✓ Processed email: status={result['status']}")
+        # Send response
+        response_sent = self.send_email_response(
+            to_address=sender_email,
+            subject=subject,
+            body=result['message']
+        )
 
-                # Mark as read if configured
-                if self.mark_as_read:
-                    mail.store(email_id, '+FLAGS', '\\Seen')
-            else:
-                logger.error("Failed to send response email")
+        if response_sent:
+            logger.info(f"✓ Processed email: status={result['status']}")
+        else:
+            logger.error("Failed to send response email")
+
+        return response_sent
 
+    def _handle_fetched(self, email_id: bytes, parsed: Tuple[str, str, str]) -> bool:
+        """Worker entry point: handle_email with errors logged per email"""
+        try:
+            return self.handle_email(*parsed)
         except Exception as e:
             logger.error(f"Error processing email {email_id}: {e}", exc_info=True)
+            return False
 
-    def check_inbox(self) -> int:
-        """Check inbox for new emails and process them"""
+    def _handle_group(self, batch: List[Tuple[bytes, Tuple[str, str, str]]]) -> Set[bytes]:
+        """Worker entry point: handle one group's emails in order; returns the answered UIDs"""
+        return {email_id for email_id, parsed in batch if self._handle_fetched(email_id, parsed)}
+
+    def _group_key(self, sender_email: str) -> Optional[str]:
+        """
+        Key of the worker group an email joins
+
+        Emails with the same key are handled one after another. Tools that
+        are not thread-safe put every email in one group.
+        """
+        if getattr(self.processor.tools, 'thread_safe', False) is not True:
+            return None
+        return sender_email.lower()
+
+    def process_email(self, mail: imaplib.IMAP4_SSL, email_id: bytes) -> None:
+        """Process a single email (email_id is an IMAP UID)"""
         try:
-            mail = self.connect_imap()
+            parsed = self.fetch_email(mail, email_id)
+            if parsed is None:
+                return
 
-            # Select inbox
-            mail.select('INBOX')
+            # Mark as read if configured
+            if self._handle_fetched(email_id, parsed) and self.mark_as_read:
+                mail.uid('STORE', email_id, '+FLAGS', '\\Seen')
 
-            # Search for unseen emails
-            status, messages = mail.search(None, 'UNSEEN')
-            if status != 'OK':
-                logger.warning("Failed to search for emails")
-                mail.logout()
-                return 0
+        except Exception as e:
+            logger.error(f"Error processing email {email_id}: {e}", exc_info=True)
+
+    def _wake(self, _future: "Future[Set[bytes]]") -> None:
+        """Worker done-callback: interrupt idle_wait"""
+        try:
+            self._wake_w.send(b'\0')
+        except OSError:
+            # Buffer full (a wakeup is already pending) or service closing
+            pass
+
+    def collect_finished(self, mail: imaplib.IMAP4_SSL) -> int:
+        """Mark answered emails from finished workers as read; returns how many finished"""
+        finished = [email_id for email_id, future in self._in_flight.items() if future.done()]
+
+        answered = [email_id for email_id in finished if email_id in self._in_flight.pop(email_id).result()]
+        if len(answered) < len(finished):
+            self._retry_failed = True
+        self._in_flight_groups = {
+            key: future for key, future in self._in_flight_groups.items() if not future.done()
+        }
+
+        # Mark as read if configured, one STORE for the whole UID set
+        if answered and self.mark_as_read:
+            for i in range(0, len(answered), FETCH_BATCH_SIZE):
+                mail.uid('STORE', b','.join(answered[i:i + FETCH_BATCH_SIZE]), '+FLAGS', '\\Seen')
+
+        return len(finished)
+
+    def process_unseen(self, mail: imaplib.IMAP4_SSL, block: bool = True) -> int:
+        """
+        Process all unseen emails in the selected mailbox
+
+        Args:
+            mail: IMAP connection with INBOX selected
+            block: Wait for the workers and mark their emails as read before
+                returning; otherwise collect_finished() does that later
+
+        Returns:
+            Number of new emails found (some may be held back until an
+            earlier batch from the same sender finishes)
+        """
+        # Search by UID so IDs stay valid across the IDLE session
+        status, messages = mail.uid('SEARCH', None, *SEARCH_CRITERIA)
+        if status != 'OK':
+            logger.warning("Failed to search for emails")
+            return 0
+        self._deferred = False
+        self._retry_failed = False
 
-            email_ids = messages[0].split()
+        # Emails still being answered are unseen too; don't start them twice
+        email_ids = [
+            email_id for email_id in messages[0].split()
+            if email_id not in self._in_flight
+        ]
 
-            if not email_ids:
-                logger.debug("No new emails")
-                mail.logout()
-                return 0
+        if not email_ids:
+            logger.debug("No new emails")
+            return 0
+
+        logger.info(f"Found {len(email_ids)} new email(s)")
+
+        if time.monotonic() - self._housemasters_loaded_at > HOUSEMASTER_REFRESH_SECONDS:
+            self.refresh_housemasters()
+
+        # Fetch on this thread; the IMAP connection can't be shared
+        fetched = self.fetch_emails(mail, email_ids)
+
+        # Group by sender; groups run concurrently, up to EMAIL_CONCURRENCY
+        # at a time, and each group's emails run in the order they arrived
+        groups: Dict[Optional[str], List[Tuple[bytes, Tuple[str, str, str]]]] = {}
+        for email_id in email_ids:
+            parsed = fetched.get(email_id)
+            if parsed is not None:
+                groups.setdefault(self._group_key(parsed[0]), []).append((email_id, parsed))
 
-            logger.info(f"Found {len(email_ids)} new email(s)")
+        for key, batch in groups.items():
+            # A sender with emails still being answered waits for them
+            if key in self._in_flight_groups:
+                self._deferred = True
+                continue
+            future = self._executor.submit(self._handle_group, batch)
+            future.add_done_callback(self._wake)
+            self._in_flight_groups[key] = future
+            for email_id, _ in batch:
+                self._in_flight[email_id] = future
 
-            # Process each email
-            for email_id in email_ids:
-                self.process_email(mail, email_id)
+        if block:
+            wait(list(self._in_flight.values()))
+            self.collect_finished(mail)
 
-            mail.logout()
-            return len(email_ids)
+        return len(email_ids)
+
+    def check_inbox(self) -> int:
+        """Check inbox for new emails and process them"""
+        try:
+            mail = self._get_imap()
+
+            return self.process_unseen(mail)
+
+        except (imaplib.IMAP4.abort, OSError) as e:
+            # Connection lost; reconnect on the next check
+            logger.warning(f"IMAP connection lost while checking inbox: {e}")
+            self._drop_imap()
+            return 0
 
         except Exception as e:
             logger.error(f"Error checking inbox: {e}", exc_info=True)
             return 0
 
+    def idle_wait(self, mail: imaplib.IMAP4_SSL, timeout: float) -> bool:
+        """
+        Wait in IMAP IDLE until the server reports new mail, a worker
+        finishes, or timeout passes
+
+        Returns:
+            True if the server pushed an EXISTS/RECENT notification
+        """
+        tag = mail._new_tag()
+        mail.send(tag + b' IDLE\r\n')
+
+        response = mail.readline()
+        if not response.startswith(b'+'):
+            raise imaplib.IMAP4.error(f"IDLE rejected: {response!r}")
+
+        new_mail = False
+        deadline = time.monotonic() + timeout
+        while not new_mail:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            # Lines that arrived with the last one sit in imaplib's buffer,
+            # where select() can't see them
+            if not self._response_ready(mail):
+                readable, _, _ = select.select([mail.sock, self._wake_r], [], [], remaining)
+                if self._wake_r in readable:
+                    self._drain_wakeups()
+                    break
+                if not readable:
+                    break
+
+            line = mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("Connection closed during IDLE")
+            if line.startswith(b'* ') and (line.rstrip().endswith(b'EXISTS') or line.rstrip().endswith(b'RECENT')):
+                new_mail = True
+
+        # Leave IDLE and drain responses up to the tagged completion
+        mail.send(b'DONE\r\n')
+        while True:
+            line = mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("Connection closed while ending IDLE")
+            if line.startswith(tag):
+                break
+            if line.rstrip().endswith(b'EXISTS'):
+                new_mail = True
+
+        return new_mail
+
+    @staticmethod
+    def _response_ready(mail: imaplib.IMAP4) -> bool:
+        """
+        True if a server response can be read without waiting on the socket
+
+        imaplib reads through a buffered file, and TLS can hold decrypted bytes
+        too; neither shows up in select(). Peek at the file with the socket
+        briefly non-blocking so an empty buffer never waits.
+        """
+        sock = mail.sock
+        timeout = sock.gettimeout()
+        sock.setblocking(False)
+        try:
+            return bool(mail.file.peek(1))
+        except (ssl.SSLWantReadError, ssl.SSLWantWriteError, BlockingIOError):
+            return False
+        finally:
+            sock.settimeout(timeout)
+
+    def _drain_wakeups(self) -> None:
+        """Discard pending worker wakeups"""
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def idle_session(self) -> None:
+        """
+        Hold one IMAP connection open and process mail as the server pushes it
+
+        Returns only if the server lacks IDLE support; connection errors are
+        raised so run() can back off and reconnect.
+        """
+        mail = self.connect_imap()
+        try:
+            if 'IDLE' not in mail.capabilities:
+                logger.warning("IMAP server does not support IDLE; falling back to polling")
+                self.use_idle = False
+                return
+
+            mail.select('INBOX')
+
+            # Catch up on anything that arrived while disconnected. Workers
+            # answer in the background while this connection goes back to IDLE.
+            self.process_unseen(mail, block=False)
+            self._idle_healthy = True
+
+            while True:
+                # Emails whose handling or reply failed stay unseen; come back
+                # for them after check_interval rather than the next new mail
+                timeout = self.check_interval if self._retry_failed else IDLE_REFRESH_SECONDS
+                new_mail = self.idle_wait(mail, timeout)
+
+                processed = self.collect_finished(mail)
+                if processed > 0:
+                    logger.info(f"Processed {processed} email(s)")
+
+                # Search again on new mail, when the wait timed out (failed
+                # emails, or anything IDLE missed), and for emails held back
+                # behind a finished sender's batch
+                timed_out = not new_mail and processed == 0
+                if new_mail or timed_out or (processed > 0 and self._deferred):
+                    self.process_unseen(mail, block=False)
+        finally:
+            try:
+                mail.logout()
+            except Exception:
+                pass
+
     def run(self) -> None:
         """Run email monitoring service"""
         logger.info("=" * 70)
@@ -276,6 +819,7 @@ class EmailLeaveService:
         logger.info(f"IMAP Server: {self.imap_server}")
         logger.info(f"SMTP Server: {self.smtp_server}")
         logger.info(f"Email: {self.email_address}")
+        logger.info(f"Mode: {'IMAP IDLE' if self.use_idle else 'polling'}")
         logger.info(f"Check Interval: {self.check_interval} seconds")
         logger.info(f"Mark as Read: {self.mark_as_read}")
         logger.info("=" * 70)
@@ -286,6 +830,12 @@ class EmailLeaveService:
 
         while True:
             try:
+                if self.use_idle:
+                    # Blocks for as long as the connection stays healthy
+                    self.idle_session()
+                    consecutive_errors = 0
+                    continue
+
                 processed = self.check_inbox()
 
                 if processed > 0:
@@ -302,6 +852,11 @@ class EmailLeaveService:
                 break
 
             except Exception as e:
+                if self._idle_healthy:
+                    # The IDLE session was up before failing; start counting afresh
+                    self._idle_healthy = False
+                    consecutive_errors = 0
+
                 consecutive_errors += 1
                 logger.error(f"Error in main loop ({consecutive_errors}/{max_consecutive_errors}): {e}")
 
@@ -314,6 +869,8 @@ class EmailLeaveService:
                 logger.info(f"Waiting {wait_time} seconds before retry...")
                 time.sleep(wait_time)
 
+        self.close()
+
 
 def main():
     """Main entry point"""
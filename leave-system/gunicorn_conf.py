@@ -0,0 +1,33 @@
+"""
+Gunicorn configuration for the Flask API (api.py)
+
+Usage:
+    gunicorn -c gunicorn_conf.py api:app
+
+Uses gevent workers so each worker can keep many requests waiting on the
+database or the Anthropic API at once. Set GUNICORN_WORKER_CLASS=sync to
+fall back to plain sync workers.
+"""
+
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8090')
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+timeout = 120
+
+# Build the app once in the master (see create_app in api.py)
+preload_app = True
+
+if worker_class == 'gevent':
+    # Patch before the app is preloaded so sockets, threads and psycopg2 all
+    # yield to the gevent hub instead of blocking the worker
+    from gevent import monkey
+    monkey.patch_all()
+
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        pass
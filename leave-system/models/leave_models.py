@@ -2,13 +2,20 @@
 Data Models for Michaelhouse Leave System
 """
 
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional, List
 from enum import Enum
 
+# Models are created per request and held in bulk for register queries, so
+# drop the per-instance __dict__ where the interpreter supports it (3.10+)
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
 
-class LeaveType(Enum):
+
+# The enums subclass str so members compare equal to their stored values
+# (LeaveType.OVERNIGHT == "Overnight") and serialize as plain strings
+class LeaveType(str, Enum):
     """Types of leave requests"""
     OVERNIGHT = "Overnight"
     FRIDAY_SUPPER = "Friday Supper"
@@ -16,7 +23,7 @@ class LeaveType(Enum):
     SPECIAL = "Special"
 
 
-class LeaveStatus(Enum):
+class LeaveStatus(str, Enum):
     """Status of leave requests"""
     PENDING = "Pending"
     APPROVED = "Approved"
@@ -25,7 +32,7 @@ class LeaveStatus(Enum):
     SPECIAL_PENDING = "Special Leave Pending"
 
 
-@dataclass
+@dataclass(frozen=True, **_SLOTS)
 class StudentInfo:
     """Student information"""
     admin_number: str
@@ -35,13 +42,14 @@ class StudentInfo:
     block: str  # Grade: A, B, C, D, E
     overnight_balance: int
     friday_supper_balance: int
+    # Derived from first/last name once at construction
+    full_name: str = field(init=False, repr=False, compare=False)
 
-    @property
-    def full_name(self) -> str:
-        return f"{self.first_name} {self.last_name}"
+    def __post_init__(self):
+        object.__setattr__(self, 'full_name', f"{self.first_name} {self.last_name}")
 
 
-@dataclass
+@dataclass(frozen=True, **_SLOTS)
 class ParentInfo:
     """Parent information"""
     auth_id: str
@@ -49,9 +57,14 @@ class ParentInfo:
     phone: Optional[str] = None
     email: Optional[str] = None
     channel: str = "unknown"  # 'whatsapp' or 'email'
+    # Preferred way to reach the parent (phone, else email), set at construction
+    contact: Optional[str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'contact', self.phone or self.email)
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class LeaveRequest:
     """Leave request details"""
     student: StudentInfo
@@ -65,7 +78,7 @@ class LeaveRequest:
     housemaster_notes: Optional[str] = None
 
 
-@dataclass
+@dataclass(frozen=True, **_SLOTS)
 class HousemasterInfo:
     """Housemaster information"""
     hm_id: str
@@ -75,7 +88,7 @@ class HousemasterInfo:
     phone: Optional[str] = None
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class LeaveRecord:
     """Complete leave record in the register"""
     leave_id: str
@@ -97,7 +110,7 @@ class LeaveRecord:
     cancelled_date: Optional[datetime] = None
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class Restriction:
     """Student leave restriction"""
     student_admin_number: str
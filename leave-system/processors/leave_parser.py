@@ -3,30 +3,109 @@ Leave Request Parser
 Extracts structured data from unstructured text requests
 """
 
+import calendar
+import functools
 import re
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, Tuple
-import sys
-from pathlib import Path
-sys.path.insert(0, str(Path(__file__).parent.parent))
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 
 from models.leave_models import LeaveType
 
+# Capitalized words that open a request or greeting rather than a name
+_NOT_NAMES = ('Can', 'Could', 'May', 'Please', 'Request', 'Hi', 'Hello', 'Dear')
+
+# Student identifiers, one named group per kind in priority order: admin
+# number (5 digits), "for [Name]", a capitalized full name, a first name after
+# common words (case-insensitive), then a name asked about ("Can James ...").
+# The lookahead reports overlapping matches so a lower-priority kind can't
+# hide a higher one.
+_STUDENT_RE = re.compile(
+    r'(?=\b(?P<admin>\d{5})\b'
+    r'|for\s+(?P<for_name>[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)'
+    r'|\b(?!(?:' + '|'.join(_NOT_NAMES) + r')\b)(?P<full_name>[A-Z][a-z]+\s+[A-Z][a-z]+)\b'
+    r'|(?i:(?:for|my son|student)\s+(?P<first_name>[A-Z][a-z]+))'
+    r'|\b(?:Can|Could|May)\s+(?P<asked_name>[A-Z][a-z]+)\b)'
+)
+_STUDENT_PRIORITY = tuple(_STUDENT_RE.groupindex)
+
+# Explicit "start to end" date range
+_RANGE_RE = re.compile(
+    r'(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})\s*(?:to|-|until)\s*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})'
+)
+
+# Absolute dates as DATE_RE/_RANGE_RE match them: day/month/year with one
+# separator (2- or 4-digit year), or day, month name and 4-digit year
+_NUMERIC_DATE_RE = re.compile(r'(\d{1,2})([-/])(\d{1,2})\2(\d{4}|\d{2})')
+_NAMED_DATE_RE = re.compile(r'(\d{1,2})\s+([a-z]+)\s+(\d{4})', re.IGNORECASE)
+
+# Full and abbreviated month names, as strptime's %B and %b accept them
+_MONTH_NUMBERS = {
+    name.lower(): number
+    for names in (calendar.month_name, calendar.month_abbr)
+    for number, name in enumerate(names) if name
+}
+
+# Words that make a date relative to today (matched against lowercased text)
+_RELATIVE_RE = re.compile(r'today|tomorrow|monday|tuesday|wednesday|thursday|friday|saturday|sunday')
+
+# Days from today for the relative words that don't name a weekday
+_DAY_OFFSETS = {'today': 0, 'tomorrow': 1}
+
+# Weekday numbers as date.weekday() returns them
+_WEEKDAY_NUMBERS = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6
+}
+
+
+def _indicator_re(*groups: Tuple[str, List[str]]) -> 're.Pattern[str]':
+    """
+    Compile (group name, phrases) pairs into one pattern with a named group each
+
+    The alternation sits inside a lookahead so overlapping phrases are all
+    reported; at a shared start position the earlier group wins.
+    """
+    alternation = '|'.join(
+        f"(?P<{name}>{'|'.join(map(re.escape, phrases))})" for name, phrases in groups
+    )
+    return re.compile(f'(?=(?:{alternation}))')
+
+
+@functools.lru_cache(maxsize=1)
+def _midnight(day_ordinal: int) -> datetime:
+    """Midnight at the start of a day, built once per day"""
+    return datetime.fromordinal(day_ordinal)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_cached(parser_cls: type, message_text: str, today: date) -> Dict[str, Any]:
+    """
+    Parse once per (parser class, text, day)
+
+    Relative dates like 'tomorrow' depend on the current day, so it is part of
+    the key. Callers must copy the returned dict before handing it out.
+    """
+    return parser_cls()._parse_uncached(message_text)
+
 
 class LeaveRequestParser:
     """Parses natural language leave requests"""
 
-    # Common date patterns
-    DATE_PATTERNS = [
+    # Common date patterns, one named group per kind so a single scan finds them all
+    DATE_RE = re.compile(
         # Full date formats
-        r'(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})',  # 15/02/2025 or 15-02-2025
-        r'(\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})',  # 15 February 2025
+        r'(?P<numeric>\d{1,2}[-/]\d{1,2}[-/]\d{2,4})'  # 15/02/2025 or 15-02-2025
+        r'|(?P<named>\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})'  # 15 February 2025
         # Relative dates
-        r'(this\s+(?:saturday|sunday|weekend|friday))',
-        r'(next\s+(?:saturday|sunday|weekend|friday))',
-        r'(tomorrow)',
-        r'(today)',
-    ]
+        r'|(?P<this>this\s+(?:saturday|sunday|weekend|friday))'
+        r'|(?P<next>next\s+(?:saturday|sunday|weekend|friday))'
+        r'|(?P<tomorrow>tomorrow)'
+        r'|(?P<today>today)',
+        re.IGNORECASE
+    )
+
+    # When several kinds of date are mentioned, the first kind listed here wins
+    DATE_PRIORITY = ('numeric', 'named', 'this', 'next', 'tomorrow', 'today')
 
     # Leave type indicators
     OVERNIGHT_INDICATORS = [
@@ -45,11 +124,28 @@ class LeaveRequestParser:
         'special leave', 'special permission', 'emergency', 'urgent'
     ]
 
-    def __init__(self):
-        self.weekdays = {
-            'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
-            'friday': 4, 'saturday': 5, 'sunday': 6
-        }
+    # Weekend days that suggest day leave when no indicator matched
+    WEEKEND_WORDS = ['saturday', 'sunday', 'weekend']
+
+    # All indicators in one pattern, groups in priority order (highest first)
+    LEAVE_TYPE_RE = _indicator_re(
+        ('SPECIAL', SPECIAL_INDICATORS),
+        ('OVERNIGHT', OVERNIGHT_INDICATORS),
+        ('FRIDAY_SUPPER', SUPPER_INDICATORS),
+        ('DAY_LEAVE', DAY_LEAVE_INDICATORS),
+        ('WEEKEND', WEEKEND_WORDS),
+    )
+    LEAVE_TYPE_PRIORITY = {name: rank for rank, name in enumerate(LEAVE_TYPE_RE.groupindex)}
+
+    # Leave times per type: (start (hour, minute), end (hour, minute), days from
+    # start to end, weekday a single date must fall on for these times or None)
+    LEAVE_TIMES = {
+        LeaveType.OVERNIGHT: ((14, 0), (18, 50), 1, 5),    # Saturday after sport to Sunday 18:50
+        LeaveType.FRIDAY_SUPPER: ((17, 0), (21, 0), 0, 4),  # Friday 17:00 to 21:00
+        LeaveType.DAY_LEAVE: ((9, 0), (17, 0), 0, None),    # Same day, reasonable hours
+    }
+    # Full day, for other types or a date on the wrong weekday
+    DEFAULT_LEAVE_TIMES = ((9, 0), (17, 0), 0, None)
 
     def parse_request(self, message_text: str) -> Dict[str, Any]:
         """
@@ -61,6 +157,39 @@ class LeaveRequestParser:
         Returns:
             Parsed data dictionary with student_identifier, dates, leave_type
         """
+        return self._parse_for_day(message_text, date.today())
+
+    def parse_requests(self, messages: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        Parse a batch of leave request texts
+
+        Args:
+            messages: Natural language requests
+
+        Returns:
+            Parsed data dictionaries, in the same order as messages
+        """
+        today = date.today()
+        return [self._parse_for_day(message_text, today) for message_text in messages]
+
+    def _parse_for_day(self, message_text: str, today: date) -> Dict[str, Any]:
+        """Parse request text through the cache for the given day"""
+        # Blank messages can't name a student or a date; answer them without
+        # running the patterns or taking a cache slot
+        if not message_text or message_text.isspace():
+            return {
+                "student_identifier": None,
+                "leave_type": LeaveType.OVERNIGHT,  # the default when unclear
+                "start_date": None,
+                "end_date": None,
+                "raw_text": message_text
+            }
+
+        # Repeats (resends, auto-replies) on the same day skip the regex work
+        return dict(_parse_cached(type(self), message_text, today))
+
+    def _parse_uncached(self, message_text: str) -> Dict[str, Any]:
+        """Parse request text without consulting the cache"""
         text_lower = message_text.lower()
 
         # Extract student identifier (name or admin number)
@@ -83,55 +212,40 @@ class LeaveRequestParser:
     def _extract_student_identifier(self, text: str) -> Optional[str]:
         """Extract student name or admin number from text"""
 
-        # Check for admin number (5 digits)
-        admin_pattern = r'\b(\d{5})\b'
-        admin_match = re.search(admin_pattern, text)
-        if admin_match:
-            return admin_match.group(1)
-
-        # Check for "for [Name]" pattern
-        for_pattern = r'for\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)'
-        for_match = re.search(for_pattern, text)
-        if for_match:
-            return for_match.group(1)
-
-        # Check for capitalized names (first and last name)
-        name_pattern = r'\b([A-Z][a-z]+\s+[A-Z][a-z]+)\b'
-        name_match = re.search(name_pattern, text)
-        if name_match:
-            return name_match.group(1)
-
-        # Check for just first name after common words
-        first_name_pattern = r'(?:for|my son|student)\s+([A-Z][a-z]+)'
-        first_name_match = re.search(first_name_pattern, text, re.IGNORECASE)
-        if first_name_match:
-            return first_name_match.group(1)
+        # One scan, keeping the first match of each kind
+        found: Dict[str, str] = {}
+        for match in _STUDENT_RE.finditer(text):
+            kind = match.lastgroup
+            if kind == 'admin':
+                return match.group(kind)
+            if kind not in found:
+                found[kind] = match.group(kind)
+
+        for kind in _STUDENT_PRIORITY:
+            if kind in found:
+                return found[kind]
 
         return None
 
     def _determine_leave_type(self, text: str) -> LeaveType:
         """Determine leave type from text"""
 
-        # Check for special leave
-        if any(indicator in text for indicator in self.SPECIAL_INDICATORS):
-            return LeaveType.SPECIAL
-
-        # Check for overnight
-        if any(indicator in text for indicator in self.OVERNIGHT_INDICATORS):
-            return LeaveType.OVERNIGHT
-
-        # Check for Friday supper
-        if any(indicator in text for indicator in self.SUPPER_INDICATORS):
-            return LeaveType.FRIDAY_SUPPER
-
-        # Check for day leave
-        if any(indicator in text for indicator in self.DAY_LEAVE_INDICATORS):
-            return LeaveType.DAY_LEAVE
+        # One pass over the text; special > overnight > supper > day leave,
+        # whatever order they appear in
+        best = None
+        for match in self.LEAVE_TYPE_RE.finditer(text):
+            kind = match.lastgroup
+            if kind == 'SPECIAL':
+                return LeaveType.SPECIAL
+            if best is None or self.LEAVE_TYPE_PRIORITY[kind] < self.LEAVE_TYPE_PRIORITY[best]:
+                best = kind
 
         # Default: analyze dates to determine
         # If mentions weekend or Saturday/Sunday, likely day leave unless overnight specified
-        if 'saturday' in text or 'sunday' in text or 'weekend' in text:
+        if best == 'WEEKEND':
             return LeaveType.DAY_LEAVE
+        if best is not None:
+            return LeaveType[best]
 
         # Default to overnight if unclear
         return LeaveType.OVERNIGHT
@@ -144,8 +258,7 @@ class LeaveRequestParser:
         """Extract start and end dates from text"""
 
         # Look for explicit date ranges
-        date_range_pattern = r'(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})\s*(?:to|-|until)\s*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})'
-        range_match = re.search(date_range_pattern, text)
+        range_match = _RANGE_RE.search(text)
 
         if range_match:
             start_str, end_str = range_match.groups()
@@ -153,11 +266,16 @@ class LeaveRequestParser:
             end_date = self._parse_date_string(end_str)
             return self._apply_leave_times(start_date, end_date, leave_type)
 
-        # Look for single date mentions
-        for pattern in self.DATE_PATTERNS:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                date_str = match.group(1)
+        # Look for single date mentions, keeping the first of each kind
+        found: Dict[str, str] = {}
+        for match in self.DATE_RE.finditer(text):
+            kind = match.lastgroup
+            if kind not in found:
+                found[kind] = match.group(kind)
+
+        for kind in self.DATE_PRIORITY:
+            date_str = found.get(kind)
+            if date_str:
                 base_date = self._parse_relative_date(date_str)
 
                 if base_date:
@@ -169,53 +287,61 @@ class LeaveRequestParser:
     def _parse_date_string(self, date_str: str) -> Optional[datetime]:
         """Parse various date string formats"""
 
-        # Try different date formats
-        formats = [
-            '%d/%m/%Y',
-            '%d-%m-%Y',
-            '%d/%m/%y',
-            '%d-%m-%y',
-            '%d %B %Y',
-            '%d %b %Y',
-        ]
-
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str, fmt)
-            except ValueError:
-                continue
-
-        return None
+        # Same formats strptime would take ('%d/%m/%Y', '%d-%m-%y', '%d %B %Y',
+        # '%d %b %Y', ...) without trying and failing each one in turn
+        match = _NUMERIC_DATE_RE.fullmatch(date_str)
+        if match:
+            day, _, month, year = match.groups()
+            year = int(year)
+            if len(match.group(4)) == 2:
+                year += 2000 if year <= 68 else 1900
+        else:
+            match = _NAMED_DATE_RE.fullmatch(date_str)
+            if not match:
+                return None
+            day, month_name, year = match.groups()
+            month = _MONTH_NUMBERS.get(month_name.lower())
+            if month is None:
+                return None
+            year = int(year)
+
+        try:
+            return datetime(year, int(month), int(day))
+        except ValueError:
+            return None
 
     def _parse_relative_date(self, date_str: str) -> Optional[datetime]:
         """Parse relative dates like 'this Saturday', 'tomorrow'"""
 
         date_str_lower = date_str.lower()
-        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
 
-        # Today/tomorrow
-        if 'today' in date_str_lower:
-            return today
-        if 'tomorrow' in date_str_lower:
-            return today + timedelta(days=1)
+        # One scan for every relative word; absolute dates skip the clock
+        words = set(_RELATIVE_RE.findall(date_str_lower))
+        if not words:
+            # Try parsing as absolute date
+            return self._parse_date_string(date_str)
+
+        today = _midnight(date.today().toordinal())
 
-        # This/next weekday
-        for day_name, day_num in self.weekdays.items():
-            if day_name in date_str_lower:
-                current_weekday = today.weekday()
-                days_ahead = day_num - current_weekday
+        # Today/tomorrow (the nearer one if both are named)
+        offsets = [_DAY_OFFSETS[word] for word in words if word in _DAY_OFFSETS]
+        if offsets:
+            return today + timedelta(days=min(offsets))
 
-                if 'next' in date_str_lower:
-                    # Next week
-                    days_ahead += 7 if days_ahead > 0 else 7
-                elif 'this' in date_str_lower or days_ahead < 0:
-                    # This coming occurrence
-                    days_ahead += 7 if days_ahead <= 0 else 0
+        # This/next weekday (earliest in the week if several are named)
+        delta = min(_WEEKDAY_NUMBERS[day_name] for day_name in words) - today.weekday()
 
-                return today + timedelta(days=days_ahead)
+        if 'next' in date_str_lower:
+            # Next week
+            days_ahead = delta + 7
+        elif 'this' in date_str_lower:
+            # This coming occurrence, a week away if that is today
+            days_ahead = delta % 7 or 7
+        else:
+            # The coming occurrence, today included
+            days_ahead = delta % 7
 
-        # Try parsing as absolute date
-        return self._parse_date_string(date_str)
+        return today + timedelta(days=days_ahead)
 
     def _infer_date_range(
         self,
@@ -224,29 +350,18 @@ class LeaveRequestParser:
     ) -> Tuple[datetime, datetime]:
         """Infer end date based on leave type and single date"""
 
-        if leave_type == LeaveType.OVERNIGHT:
-            # Saturday after sport to Sunday 18:50
-            if base_date.weekday() == 5:  # Saturday
-                start = base_date.replace(hour=14, minute=0)  # After sport ~14:00
-                end = (base_date + timedelta(days=1)).replace(hour=18, minute=50)
-                return start, end
-
-        elif leave_type == LeaveType.FRIDAY_SUPPER:
-            # Friday 17:00 to 21:00
-            if base_date.weekday() == 4:  # Friday
-                start = base_date.replace(hour=17, minute=0)
-                end = base_date.replace(hour=21, minute=0)
-                return start, end
-
-        elif leave_type == LeaveType.DAY_LEAVE:
-            # Same day, reasonable hours
-            start = base_date.replace(hour=9, minute=0)
-            end = base_date.replace(hour=17, minute=0)
-            return start, end
-
-        # Default: full day
-        start = base_date.replace(hour=9, minute=0)
-        end = base_date.replace(hour=17, minute=0)
+        times = self.LEAVE_TIMES.get(leave_type)
+        if times is None or (times[3] is not None and base_date.weekday() != times[3]):
+            times = self.DEFAULT_LEAVE_TIMES
+
+        # Build each datetime directly from the date parts instead of copying
+        # base_date through replace()
+        (start_hour, start_minute), (end_hour, end_minute), days, _ = times
+        year, month, day = base_date.year, base_date.month, base_date.day
+        start = datetime(year, month, day, start_hour, start_minute)
+        end = datetime(year, month, day, end_hour, end_minute)
+        if days:
+            end += timedelta(days=days)
         return start, end
 
     def _apply_leave_times(
@@ -260,19 +375,11 @@ class LeaveRequestParser:
         if not start_date or not end_date:
             return start_date, end_date
 
-        if leave_type == LeaveType.OVERNIGHT:
-            # Saturday 14:00 to Sunday 18:50
-            start_date = start_date.replace(hour=14, minute=0)
-            end_date = end_date.replace(hour=18, minute=50)
-
-        elif leave_type == LeaveType.FRIDAY_SUPPER:
-            # Friday 17:00 to 21:00
-            start_date = start_date.replace(hour=17, minute=0)
-            end_date = end_date.replace(hour=21, minute=0)
-
-        elif leave_type == LeaveType.DAY_LEAVE:
-            # 9:00 to 17:00
-            start_date = start_date.replace(hour=9, minute=0)
-            end_date = end_date.replace(hour=17, minute=0)
+        # Explicit ranges keep their dates; only the times are set
+        times = self.LEAVE_TIMES.get(leave_type)
+        if times is not None:
+            (start_hour, start_minute), (end_hour, end_minute) = times[0], times[1]
+            start_date = datetime(start_date.year, start_date.month, start_date.day, start_hour, start_minute)
+            end_date = datetime(end_date.year, end_date.month, end_date.day, end_hour, end_minute)
 
         return start_date, end_date
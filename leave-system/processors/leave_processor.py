@@ -3,18 +3,105 @@ Leave Request Processor
 Implements the core leave approval workflow per FR1-FR6
 """
 
-from datetime import datetime
+import functools
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from typing import Dict, Any, Tuple, Optional
-import sys
-from pathlib import Path
-sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from models.leave_models import (
     LeaveType, LeaveStatus, LeaveRequest, StudentInfo,
     ParentInfo, HousemasterInfo
 )
+from processors.leave_parser import LeaveRequestParser
 from tools.placeholder_tools import LeaveSystemTools
 
+logger = logging.getLogger(__name__)
+
+# Student admin number (5 digits) in housemaster requests
+_ADMIN_RE = re.compile(r'\b(\d{5})\b')
+
+# Housemaster intents, one group each in priority order (highest first).
+# Plain substring matches, so "cancellation" counts as cancel; the lookahead
+# reports overlapping words so the best intent wins wherever it appears.
+_HM_INTENT_RE = re.compile(
+    r'(?=(?P<cancel>cancel|revoke)'
+    r'|(?P<restrict>restrict|block)'
+    r'|(?P<balance>balance|how many)'
+    r'|(?P<leave>leave|exeat))',
+    re.IGNORECASE
+)
+_HM_INTENT_PRIORITY = {name: rank for rank, name in enumerate(_HM_INTENT_RE.groupindex)}
+
+# Cancellation reason markers; "because" wins over "reason:" wherever it is
+_BECAUSE_RE = re.compile(r'because', re.IGNORECASE)
+_REASON_RE = re.compile(r'reason:', re.IGNORECASE)
+
+# Balance-limited leave types: (StudentInfo balance attribute, balance check
+# category, label used in messages)
+_BALANCE_CONFIG = {
+    LeaveType.OVERNIGHT: ('overnight_balance', 'Overnight', 'overnight'),
+    LeaveType.FRIDAY_SUPPER: ('friday_supper_balance', 'Supper', 'Friday Supper'),
+}
+
+# Leave types blocked by an active restriction (FR3.7)
+_RESTRICTED_TYPES = frozenset({LeaveType.OVERNIGHT, LeaveType.FRIDAY_SUPPER, LeaveType.DAY_LEAVE})
+
+# Runs a student's balance lookup alongside their restriction check when the
+# tools backend is thread-safe; shared by every processor so the threads are
+# only started once
+_CHECK_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv('ELIGIBILITY_CHECK_WORKERS', '8')),
+    thread_name_prefix='eligibility-check'
+)
+
+# Special leave email forwarded to the Housemaster (see _route_to_special_leave)
+_SPECIAL_LEAVE_TEMPLATE = """Special Leave Request Forwarded
+
+Student: {name} ({admin_number})
+House: {house}
+Block: {block}
+
+Requesting Parent: {parent}
+Contact: {contact}
+
+Leave Type: {leave_type}
+Dates: {start} to {end}
+
+Reason for Special Leave: {trigger_reason}
+
+Please respond with "APPROVE" or "REJECT" to process this request.
+"""
+
+
+# English names for message dates, without strftime's locale lookups
+_MONTHS = (
+    None, 'January', 'February', 'March', 'April', 'May', 'June', 'July',
+    'August', 'September', 'October', 'November', 'December'
+)
+_WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+
+def _format_datetime(dt: datetime) -> str:
+    """'14 February 2025 14:00' (strftime '%d %B %Y %H:%M')"""
+    return f"{dt.day:02d} {_MONTHS[dt.month]} {dt.year} {dt.hour:02d}:{dt.minute:02d}"
+
+
+def _format_day_datetime(dt: datetime) -> str:
+    """'Friday 14 February 2025 at 14:00' (strftime '%A %d %B %Y at %H:%M')"""
+    return (
+        f"{_WEEKDAYS[dt.weekday()]} {dt.day:02d} {_MONTHS[dt.month]} {dt.year} "
+        f"at {dt.hour:02d}:{dt.minute:02d}"
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def _hm_email_for_house(house: str) -> str:
+    """Housemaster mailbox for a house"""
+    return f"hm.{house.lower()}@michaelhouse.org"
+
 
 class LeaveProcessor:
     """
@@ -22,8 +109,16 @@ class LeaveProcessor:
     Implements the sequential decision protocol from requirements
     """
 
-    def __init__(self):
-        self.tools = LeaveSystemTools()
+    __slots__ = ('tools', 'parser')
+
+    def __init__(self, tools: Optional[Any] = None):
+        """
+        Args:
+            tools: Backend tools (database, Google Sheets); placeholder tools if omitted
+        """
+        self.tools = tools if tools is not None else LeaveSystemTools()
+        # Stateless, so one parser serves every request
+        self.parser = LeaveRequestParser()
 
     def process_parent_request(
         self,
@@ -55,9 +150,7 @@ class LeaveProcessor:
         parent_info = auth_result['parent_info']
 
         # Parse the request
-        from processors.leave_parser import LeaveRequestParser
-        parser = LeaveRequestParser()
-        parsed_data = parser.parse_request(message_text)
+        parsed_data = self.parser.parse_request(message_text)
 
         if not parsed_data['student_identifier']:
             return {
@@ -189,8 +282,20 @@ class LeaveProcessor:
         if leave_request.leave_type == LeaveType.DAY_LEAVE:
             return self._approve_leave(leave_request, deduct_balance=False)
 
+        # FR3.4, FR3.5: With a thread-safe backend, start the balance lookup
+        # now; it doesn't depend on the restriction check, which runs here
+        # meanwhile
+        balance_config = _BALANCE_CONFIG.get(leave_request.leave_type)
+        balance_future = None
+        if balance_config and getattr(self.tools, 'thread_safe', False) is True:
+            balance_future = _CHECK_EXECUTOR.submit(
+                self.tools.tool_leave_balance_check,
+                leave_request.student.admin_number,
+                balance_config[1]
+            )
+
         # FR3.7: Restriction Check (for weekend leaves)
-        if leave_request.leave_type in [LeaveType.OVERNIGHT, LeaveType.FRIDAY_SUPPER, LeaveType.DAY_LEAVE]:
+        if leave_request.leave_type in _RESTRICTED_TYPES:
             is_restricted = self.tools.tool_restriction_check(
                 leave_request.student.admin_number,
                 leave_request.start_date,
@@ -204,26 +309,19 @@ class LeaveProcessor:
                 )
 
         # FR3.4, FR3.5: Balance Check
-        if leave_request.leave_type == LeaveType.OVERNIGHT:
-            balance = self.tools.tool_leave_balance_check(
-                leave_request.student.admin_number,
-                'Overnight'
-            )
-            if balance < 1:
-                return self._reject_leave(
-                    leave_request,
-                    f"{leave_request.student.full_name} has insufficient overnight leave balance (0 remaining)"
+        if balance_config:
+            _, category, label = balance_config
+            if balance_future is not None:
+                balance = balance_future.result()
+            else:
+                balance = self.tools.tool_leave_balance_check(
+                    leave_request.student.admin_number,
+                    category
                 )
-
-        elif leave_request.leave_type == LeaveType.FRIDAY_SUPPER:
-            balance = self.tools.tool_leave_balance_check(
-                leave_request.student.admin_number,
-                'Supper'
-            )
             if balance < 1:
                 return self._reject_leave(
                     leave_request,
-                    f"{leave_request.student.full_name} has insufficient Friday Supper leave balance (0 remaining)"
+                    f"{leave_request.student.full_name} has insufficient {label} leave balance (0 remaining)"
                 )
 
         # FR4.1: Check if explicit special leave requested
@@ -269,16 +367,14 @@ class LeaveProcessor:
 
         # Calculate new balance
         new_balance = None
-        if deduct_balance:
-            if leave_request.leave_type == LeaveType.OVERNIGHT:
-                new_balance = leave_request.student.overnight_balance - 1
-                balance_type = "overnight"
-            elif leave_request.leave_type == LeaveType.FRIDAY_SUPPER:
-                new_balance = leave_request.student.friday_supper_balance - 1
-                balance_type = "Friday Supper"
+        balance_type = None
+        balance_config = _BALANCE_CONFIG.get(leave_request.leave_type) if deduct_balance else None
+        if balance_config:
+            balance_attr, _, balance_type = balance_config
+            new_balance = getattr(leave_request.student, balance_attr) - 1
 
         # FR6.1: Approval notification
-        message = self._format_approval_message(leave_request, new_balance, balance_type if deduct_balance else None)
+        message = self._format_approval_message(leave_request, new_balance, balance_type)
 
         return {
             'status': 'approved',
@@ -297,12 +393,13 @@ class LeaveProcessor:
         Returns:
             Rejection result with notification message
         """
+        name = leave_request.student.full_name
 
         message = f"""Thank you for your request.
 
-Unfortunately, I'm unable to approve the exeat for {leave_request.student.full_name} on this occasion because {reason}.
+Unfortunately, I'm unable to approve the exeat for {name} on this occasion because {reason}.
 
-If you require this leave to be granted, please contact {leave_request.student.full_name}'s Housemaster directly to request a Special Leave."""
+If you require this leave to be granted, please contact {name}'s Housemaster directly to request a Special Leave."""
 
         return {
             'status': 'rejected',
@@ -326,37 +423,24 @@ If you require this leave to be granted, please contact {leave_request.student.f
         Returns:
             Pending result with notification message
         """
-
-        # FR4.2: Send email to Housemaster (placeholder)
-        housemaster_email = f"hm.{leave_request.student.house.lower()}@michaelhouse.org"
-
-        email_content = f"""Special Leave Request Forwarded
-
-Student: {leave_request.student.full_name} ({leave_request.student.admin_number})
-House: {leave_request.student.house}
-Block: {leave_request.student.block}
-
-Requesting Parent: {leave_request.parent.auth_id}
-Contact: {leave_request.parent.phone or leave_request.parent.email}
-
-Leave Type: {leave_request.leave_type.value}
-Dates: {leave_request.start_date.strftime('%d %B %Y %H:%M')} to {leave_request.end_date.strftime('%d %B %Y %H:%M')}
-
-Reason for Special Leave: {trigger_reason}
-
-Please respond with "APPROVE" or "REJECT" to process this request.
-"""
-
-        print(f"\n[SPECIAL LEAVE EMAIL SENT TO: {housemaster_email}]")
-        print(email_content)
-        print("[END EMAIL]\n")
+        student = leave_request.student
+
+        # FR4.2: Send email to Housemaster (placeholder); only formatted when
+        # someone is reading the log
+        if logger.isEnabledFor(logging.INFO):
+            housemaster_email = _hm_email_for_house(student.house)
+            logger.info(
+                "Special leave email to %s:\n%s",
+                housemaster_email,
+                self._format_special_leave_email(leave_request, trigger_reason)
+            )
 
         # FR6.3: Notify parent that request is pending
         message = f"""Thank you for your request.
 
-This leave request for {leave_request.student.full_name} requires special approval as {trigger_reason.lower()}.
+This leave request for {student.full_name} requires special approval as {trigger_reason.lower()}.
 
-I have forwarded your request to the {leave_request.student.house} Housemaster for manual review. You will be notified once a decision has been made.
+I have forwarded your request to the {student.house} Housemaster for manual review. You will be notified once a decision has been made.
 
 Thank you for your patience."""
 
@@ -367,6 +451,28 @@ Thank you for your patience."""
             'message': message
         }
 
+    def _format_special_leave_email(
+        self,
+        leave_request: LeaveRequest,
+        trigger_reason: str
+    ) -> str:
+        """Format the special leave email forwarded to the Housemaster"""
+        student = leave_request.student
+        parent = leave_request.parent
+
+        return _SPECIAL_LEAVE_TEMPLATE.format(
+            name=student.full_name,
+            admin_number=student.admin_number,
+            house=student.house,
+            block=student.block,
+            parent=parent.auth_id,
+            contact=parent.contact,
+            leave_type=leave_request.leave_type.value,
+            start=_format_datetime(leave_request.start_date),
+            end=_format_datetime(leave_request.end_date),
+            trigger_reason=trigger_reason
+        )
+
     def _format_approval_message(
         self,
         leave_request: LeaveRequest,
@@ -379,7 +485,7 @@ Thank you for your patience."""
 
 I'm pleased to confirm that the exeat request for {leave_request.student.full_name} for {leave_request.leave_type.value} leave has been approved.
 
-Dates: {leave_request.start_date.strftime('%A %d %B %Y at %H:%M')} to {leave_request.end_date.strftime('%A %d %B %Y at %H:%M')}"""
+Dates: {_format_day_datetime(leave_request.start_date)} to {_format_day_datetime(leave_request.end_date)}"""
 
         if new_balance is not None:
             message += f"\n\nRemaining {balance_type} leave balance: {new_balance}"
@@ -420,19 +526,25 @@ Dates: {leave_request.start_date.strftime('%A %d %B %Y at %H:%M')} to {leave_req
             house=hm_info['assignedHouse']
         )
 
-        text_lower = message_text.lower()
+        # Determine intent (one scan; cancel > restrict > balance > leave)
+        intent = None
+        for match in _HM_INTENT_RE.finditer(message_text):
+            kind = match.lastgroup
+            if intent is None or _HM_INTENT_PRIORITY[kind] < _HM_INTENT_PRIORITY[intent]:
+                intent = kind
+                if intent == 'cancel':
+                    break
 
-        # Determine intent
-        if 'cancel' in text_lower or 'revoke' in text_lower:
+        if intent == 'cancel':
             return self._process_hm_cancellation(message_text, housemaster)
 
-        elif 'restrict' in text_lower or 'restriction' in text_lower or 'block' in text_lower:
+        elif intent == 'restrict':
             return self._process_hm_restriction(message_text, housemaster)
 
-        elif 'balance' in text_lower or 'how many' in text_lower:
+        elif intent == 'balance':
             return self._process_hm_balance_query(message_text, housemaster)
 
-        elif 'leave' in text_lower or 'exeat' in text_lower:
+        elif intent == 'leave':
             return self._process_hm_leave_query(message_text, housemaster)
 
         else:
@@ -450,9 +562,7 @@ Dates: {leave_request.start_date.strftime('%A %d %B %Y at %H:%M')} to {leave_req
 
         # Extract student identifier and reason
         # Simplified parsing for placeholder
-        admin_pattern = r'\b(\d{5})\b'
-        import re
-        match = re.search(admin_pattern, message_text)
+        match = _ADMIN_RE.search(message_text)
 
         if not match:
             return {
@@ -462,12 +572,11 @@ Dates: {leave_request.start_date.strftime('%A %d %B %Y at %H:%M')} to {leave_req
 
         student_admin_number = match.group(1)
 
-        # Extract reason (everything after "because" or "reason:")
+        # Extract reason (everything after "because" or "reason:"), keeping its case
         reason = "Housemaster decision"
-        if 'because' in message_text.lower():
-            reason = message_text.lower().split('because', 1)[1].strip()
-        elif 'reason:' in message_text.lower():
-            reason = message_text.lower().split('reason:', 1)[1].strip()
+        marker = _BECAUSE_RE.search(message_text) or _REASON_RE.search(message_text)
+        if marker:
+            reason = message_text[marker.end():].strip()
 
         # FR9.4: Cancel and refund balance
         success = self.tools.tool_leave_update(
@@ -506,9 +615,7 @@ Dates: {leave_request.start_date.strftime('%A %d %B %Y at %H:%M')} to {leave_req
 
         # Extract student admin number and dates
         # Simplified parsing for placeholder
-        import re
-        admin_pattern = r'\b(\d{5})\b'
-        match = re.search(admin_pattern, message_text)
+        match = _ADMIN_RE.search(message_text)
 
         if not match:
             return {
@@ -551,9 +658,7 @@ Dates: {leave_request.start_date.strftime('%A %d %B %Y at %H:%M')} to {leave_req
         """FR9.2: Query student balance"""
 
         # Extract student admin number
-        import re
-        admin_pattern = r'\b(\d{5})\b'
-        match = re.search(admin_pattern, message_text)
+        match = _ADMIN_RE.search(message_text)
 
         if not match:
             return {
@@ -587,9 +692,7 @@ Friday Supper Leave: {balances.get('fridaySupper', 0)} remaining"""
         """FR9.2: Query student leave history"""
 
         # Extract student admin number
-        import re
-        admin_pattern = r'\b(\d{5})\b'
-        match = re.search(admin_pattern, message_text)
+        match = _ADMIN_RE.search(message_text)
 
         if not match:
             return {
@@ -614,14 +717,14 @@ Friday Supper Leave: {balances.get('fridaySupper', 0)} remaining"""
                 'message': f"No leave history found for student {student_admin_number}."
             }
 
-        message = f"Leave History for Student {student_admin_number}:\n\n"
-        for leave in leaves:
-            message += f"• {leave['leaveType']}: {leave['startDate']} to {leave['endDate']} ({leave['status']})\n"
+        parts = [f"Leave History for Student {student_admin_number}:\n\n"]
+        parts.extend(
+            f"• {leave['leaveType']}: {leave['startDate']} to {leave['endDate']} ({leave['status']})\n"
+            for leave in leaves
+        )
+        message = ''.join(parts)
 
         return {
             'status': 'success',
             'message': message
         }
-
-
-from datetime import timedelta
@@ -4,13 +4,8 @@ Shared test utilities
 """
 
 import pytest
-import os
-import sys
 from pathlib import Path
 
-# Add parent directory to path for all tests
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 
 @pytest.fixture(scope='session')
 def test_data_dir():
@@ -38,14 +33,13 @@ def sample_housemaster_request():
     }
 
 
-@pytest.fixture(autouse=True)
-def reset_environment():
-    """Reset environment for each test"""
-    # Save original environment
-    original_env = os.environ.copy()
-
-    yield
-
-    # Restore original environment
-    os.environ.clear()
-    os.environ.update(original_env)
+@pytest.fixture
+def reset_environment(monkeypatch):
+    """
+    Environment changes for a single test
+
+    Request this in tests that change environment variables and use the
+    returned monkeypatch's setenv/delenv; only those changes are undone at
+    teardown, so tests that leave the environment alone pay nothing.
+    """
+    return monkeypatch
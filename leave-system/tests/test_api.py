@@ -4,25 +4,21 @@ Tests API request/response handling
 """
 
 import pytest
-import sys
-import json
-from pathlib import Path
-
-sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from api import app as dev_app
 
 
+@pytest.fixture(scope='module')
+def client():
+    """Create one test client shared by every test in the module"""
+    dev_app.config['TESTING'] = True
+    with dev_app.test_client() as client:
+        yield client
+
+
 class TestLeaveAPI:
     """Test suite for Flask API"""
 
-    @pytest.fixture
-    def client(self):
-        """Create test client"""
-        dev_app.config['TESTING'] = True
-        with dev_app.test_client() as client:
-            yield client
-
     # ==================== Health Check Tests ====================
 
     def test_health_check(self, client):
@@ -30,7 +26,7 @@ class TestLeaveAPI:
         response = client.get('/health')
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['status'] == 'healthy'
         assert 'service' in data
 
@@ -46,12 +42,11 @@ class TestLeaveAPI:
 
         response = client.post(
             '/api/process_parent_request',
-            data=json.dumps(payload),
-            content_type='application/json'
+            json=payload
         )
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'status' in data
         assert 'message' in data
 
@@ -64,12 +59,11 @@ class TestLeaveAPI:
 
         response = client.post(
             '/api/process_parent_request',
-            data=json.dumps(payload),
-            content_type='application/json'
+            json=payload
         )
 
         assert response.status_code == 400
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['status'] == 'error'
         assert 'missing' in data['message'].lower()
 
@@ -83,12 +77,29 @@ class TestLeaveAPI:
 
         response = client.post(
             '/api/process_parent_request',
-            data=json.dumps(payload),
-            content_type='application/json'
+            json=payload
         )
 
         assert response.status_code == 400
-        data = json.loads(response.data)
+        data = response.get_json()
+        assert 'invalid channel' in data['message'].lower()
+
+    def test_process_parent_request_unhashable_channel(self, client):
+        """Test request whose channel is not a string"""
+        payload = {
+            'message': 'Can James have leave?',
+            'sender': '27603174174',
+            'channel': {'a': 1}
+        }
+
+        response = client.post(
+            '/api/process_parent_request',
+            json=payload
+        )
+
+        assert response.status_code == 400
+        data = response.get_json()
+        assert data['status'] == 'error'
         assert 'invalid channel' in data['message'].lower()
 
     def test_process_parent_request_no_json(self, client):
@@ -107,12 +118,11 @@ class TestLeaveAPI:
 
         response = client.post(
             '/api/process_parent_request',
-            data=json.dumps(payload),
-            content_type='application/json'
+            json=payload
         )
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'status' in data
 
     # ==================== Housemaster Request Tests ====================
@@ -127,12 +137,11 @@ class TestLeaveAPI:
 
         response = client.post(
             '/api/process_housemaster_request',
-            data=json.dumps(payload),
-            content_type='application/json'
+            json=payload
         )
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'status' in data
         assert 'message' in data
 
@@ -145,8 +154,7 @@ class TestLeaveAPI:
 
         response = client.post(
             '/api/process_housemaster_request',
-            data=json.dumps(payload),
-            content_type='application/json'
+            json=payload
         )
 
         assert response.status_code == 400
@@ -161,8 +169,7 @@ class TestLeaveAPI:
 
         response = client.post(
             '/api/process_housemaster_request',
-            data=json.dumps(payload),
-            content_type='application/json'
+            json=payload
         )
 
         assert response.status_code == 200
@@ -174,7 +181,7 @@ class TestLeaveAPI:
         response = client.get('/api/nonexistent')
 
         assert response.status_code == 404
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['status'] == 'error'
 
     def test_method_not_allowed(self, client):
@@ -195,11 +202,10 @@ class TestLeaveAPI:
 
         response = client.post(
             '/api/process_parent_request',
-            data=json.dumps(payload),
-            content_type='application/json'
+            json=payload
         )
 
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'status' in data
         assert 'message' in data
 
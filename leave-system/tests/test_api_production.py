@@ -0,0 +1,93 @@
+"""
+Unit tests for the production API's response caches
+Tests which repeated requests are answered from cache
+"""
+
+import pytest
+
+# api_production is the Quart app and loads the database tools at import
+# time; skip where either isn't installed
+pytest.importorskip('quart')
+pytest.importorskip('psycopg2')
+
+import api_production
+from api_production import LeaveResponseCache, TTLCache
+
+
+class FakeClock:
+    """Stand-in for time.monotonic that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Freeze the cache clock for one test"""
+    fake = FakeClock()
+    monkeypatch.setattr(api_production.time, 'monotonic', fake)
+    return fake
+
+
+class TestLeaveResponseCache:
+    """Test suite for the parent request response cache"""
+
+    APPROVED = {'status': 'approved', 'message': 'Leave approved for James'}
+
+    def test_repeated_request_hits_cache(self, clock):
+        """Test the same message is answered from cache, ignoring case and spacing"""
+        cache = LeaveResponseCache(ttl=600)
+        cache.store('27603174174', 'Can James have leave this Saturday?', 'whatsapp', self.APPROVED)
+
+        cached = cache.lookup('27603174174', '  can james have   leave this Saturday? ', 'whatsapp')
+
+        assert cached == self.APPROVED
+
+    def test_cache_is_per_sender_and_channel(self, clock):
+        """Test another sender or channel does not get the cached answer"""
+        cache = LeaveResponseCache(ttl=600)
+        cache.store('27603174174', 'Can James have leave?', 'whatsapp', self.APPROVED)
+
+        assert cache.lookup('27600000000', 'Can James have leave?', 'whatsapp') is None
+        assert cache.lookup('27603174174', 'Can James have leave?', 'email') is None
+
+    def test_error_result_not_stored(self, clock):
+        """Test an error result is not cached, so a retry is processed again"""
+        cache = LeaveResponseCache(ttl=600)
+        cache.store('27603174174', 'Can James have leave?', 'whatsapp', {
+            'status': 'error',
+            'message': 'An error occurred processing your request.'
+        })
+
+        assert cache.lookup('27603174174', 'Can James have leave?', 'whatsapp') is None
+
+    def test_entry_expires_after_ttl(self, clock):
+        """Test a cached answer is dropped once its TTL has passed"""
+        cache = LeaveResponseCache(ttl=600)
+        cache.store('27603174174', 'Can James have leave?', 'whatsapp', self.APPROVED)
+
+        clock.now += 600
+        assert cache.lookup('27603174174', 'Can James have leave?', 'whatsapp') == self.APPROVED
+
+        clock.now += 1
+        assert cache.lookup('27603174174', 'Can James have leave?', 'whatsapp') is None
+
+
+class TestTTLCache:
+    """Test suite for the expiring LRU mapping"""
+
+    def test_least_recently_used_entry_evicted(self, clock):
+        """Test the entry read least recently is evicted when full"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+
+        cache.set('c', 3)
+
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.get('c') == 3
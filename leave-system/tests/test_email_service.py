@@ -0,0 +1,90 @@
+"""
+Unit tests for the email service
+Tests how incoming emails are routed
+"""
+
+import pytest
+from unittest.mock import Mock
+
+# email_service loads the database tools at import time
+pytest.importorskip('psycopg2')
+
+from email_service import EmailLeaveService, classify_email
+
+
+class TestClassifyEmail:
+    """Test suite for sender-based email routing"""
+
+    def test_hm_address_is_housemaster(self):
+        """Test hm.* addresses route to the housemaster processor"""
+        assert classify_email('hm.finningley@michaelhouse.org') == 'housemaster'
+        assert classify_email('HM.Finningley@michaelhouse.org') == 'housemaster'
+
+    def test_registered_housemaster(self):
+        """Test registered housemaster addresses route regardless of case"""
+        registered = frozenset({'j.smith@michaelhouse.org'})
+
+        assert classify_email('J.Smith@michaelhouse.org', registered) == 'housemaster'
+
+    def test_parent_address_is_parent(self):
+        """Test ordinary addresses route to the parent processor"""
+        assert classify_email('parent@gmail.com') == 'parent'
+
+    def test_hm_inside_address_is_parent(self):
+        """Test addresses that only contain "hm." are not housemasters"""
+        assert classify_email('parent@bohm.co.za') == 'parent'
+        assert classify_email('j.rahm.smith@gmail.com') == 'parent'
+
+    def test_parent_asking_to_cancel_is_parent(self):
+        """Test a parent whose email says "cancel" reaches the parent processor"""
+        service = EmailLeaveService.__new__(EmailLeaveService)
+        service.housemaster_emails = frozenset()
+        service.processor = Mock()
+        service.processor.process_parent_request.return_value = {
+            'status': 'success',
+            'message': 'Your request has been cancelled'
+        }
+        service.send_email_response = Mock(return_value=True)
+
+        sent = service.handle_email(
+            'parent@bohm.co.za',
+            'Leave request',
+            'Please cancel my request and check the balance'
+        )
+
+        assert sent is True
+        service.processor.process_parent_request.assert_called_once()
+        service.processor.process_housemaster_request.assert_not_called()
+
+
+class TestFetchEmails:
+    """Test suite for batched email fetching"""
+
+    HEADERS = {
+        b'1': b'From: parent@gmail.com\r\nSubject: Scan\r\nContent-Type: application/pdf\r\n\r\n',
+        b'2': b'From: parent@gmail.com\r\nSubject: Leave\r\n\r\n',
+    }
+
+    def _fetch(self, uid_set, query):
+        """Fake UID FETCH returning the headers or a text body per UID"""
+        response = []
+        for uid in uid_set.split(b','):
+            if 'HEADER' in query:
+                response.append((b'1 (UID ' + uid + b' BODY[HEADER.FIELDS (FROM)] {1}', self.HEADERS[uid]))
+            else:
+                response.append((b'1 (UID ' + uid + b' BODY[TEXT] {1}', b'Can James have leave?'))
+            response.append(b')')
+        return 'OK', response
+
+    def test_attachment_only_email_body_not_fetched(self):
+        """Test a bare attachment gets an empty body without fetching it"""
+        service = EmailLeaveService.__new__(EmailLeaveService)
+        mail = Mock()
+        mail.uid.side_effect = lambda command, uid_set, query: self._fetch(uid_set, query)
+
+        emails = service.fetch_emails(mail, [b'1', b'2'])
+
+        assert emails[b'1'] == ('parent@gmail.com', 'Scan', '')
+        assert emails[b'2'] == ('parent@gmail.com', 'Leave', 'Can James have leave?')
+        body_fetches = [c.args[1] for c in mail.uid.call_args_list if 'HEADER' not in c.args[2]]
+        assert body_fetches == [b'2']
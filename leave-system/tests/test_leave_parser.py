@@ -4,25 +4,21 @@ Tests natural language parsing of leave requests
 """
 
 import pytest
-import sys
-from pathlib import Path
 from datetime import datetime, timedelta
 
-# Add parent directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from processors.leave_parser import LeaveRequestParser
 from models.leave_models import LeaveType
 
 
+@pytest.fixture(scope='module')
+def parser():
+    """Create one parser shared by every test in the module (it holds no state)"""
+    return LeaveRequestParser()
+
+
 class TestLeaveRequestParser:
     """Test suite for leave request parsing"""
 
-    @pytest.fixture
-    def parser(self):
-        """Create parser instance for tests"""
-        return LeaveRequestParser()
-
     # ==================== Student Identifier Extraction ====================
 
     def test_extract_admin_number(self, parser):
@@ -212,6 +208,29 @@ class TestLeaveRequestParser:
         # Should get the first name pattern
         assert result['student_identifier'] in ["James Smith", "James"]
 
+    def test_parse_requests_batch(self, parser):
+        """Test batch parsing returns each message's fields in input order"""
+        messages = [
+            "Can James Smith have overnight leave this Saturday?",
+            "",
+            "Request leave for student 67890 on 14/02/2025",
+        ]
+
+        results = parser.parse_requests(messages)
+
+        # One result per message, in the input order
+        assert [r['raw_text'] for r in results] == messages
+
+        assert results[0]['student_identifier'] == "James Smith"
+        assert results[0]['leave_type'] == LeaveType.OVERNIGHT
+
+        assert results[1]['student_identifier'] is None
+        assert results[1]['start_date'] is None
+        assert results[1]['end_date'] is None
+
+        assert results[2]['student_identifier'] == "67890"
+        assert results[2]['start_date'].date() == datetime(2025, 2, 14).date()
+
     def test_empty_message(self, parser):
         """Test handling of empty message"""
         result = parser.parse_request("")
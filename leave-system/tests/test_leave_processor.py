@@ -4,13 +4,9 @@ Tests the core business logic and workflows
 """
 
 import pytest
-import sys
-from pathlib import Path
 from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
 
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from processors.leave_processor import LeaveProcessor
 from models.leave_models import LeaveType, LeaveStatus, StudentInfo, ParentInfo
 from tools.placeholder_tools import LeaveSystemTools
@@ -4,10 +4,12 @@ Replaces placeholder_tools.py with real PostgreSQL database queries
 """
 
 import os
-import psycopg2
+import threading
+from contextlib import contextmanager
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, Iterator, List, Any, Set
 from dotenv import load_dotenv
 import uuid
 
@@ -17,6 +19,9 @@ load_dotenv()
 class DatabaseTools:
     """Production database implementation of LeaveSystemTools"""
 
+    # Every query borrows its own connection from the thread-safe pool
+    thread_safe = True
+
     def __init__(self, db_config: Optional[Dict[str, str]] = None):
         """
         Initialize database connection
@@ -35,13 +40,48 @@ class DatabaseTools:
             }
 
         self.db_config = db_config
-        self._connection = None
+        # Pool is created on first use; size it to workers x threads.
+        # ThreadedConnectionPool keeps only minconn idle connections and closes
+        # the rest when they are returned, so min defaults to max to keep every
+        # connection open for reuse
+        self.pool_max_size = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+        self.pool_min_size = int(os.getenv('DB_POOL_MIN_SIZE', str(self.pool_max_size)))
+        self._pool: Optional[ThreadedConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        # psycopg2 pools raise when exhausted; wait for a free slot instead
+        self._pool_slots = threading.BoundedSemaphore(self.pool_max_size)
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        """Get or create the connection pool"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadedConnectionPool(
+                        self.pool_min_size,
+                        self.pool_max_size,
+                        **self.db_config
+                    )
+        return self._pool
+
+    @contextmanager
+    def _get_connection(self) -> Iterator[Any]:
+        """
+        Borrow a database connection from the pool
+
+        Usage:
+            with self._get_connection() as conn:
+                ...
 
-    def _get_connection(self):
-        """Get or create database connection"""
-        if self._connection is None or self._connection.closed:
-            self._connection = psycopg2.connect(**self.db_config)
-        return self._connection
+        The connection is returned to the pool on exit; any transaction left
+        open is rolled back by the pool.
+        """
+        pool = self._get_pool()
+        with self._pool_slots:
+            conn = pool.getconn()
+            try:
+                yield conn
+            finally:
+                pool.putconn(conn)
 
     def _execute_query(self, query: str, params: tuple = None, fetch_one: bool = False):
         """
@@ -55,18 +95,18 @@ class DatabaseTools:
         Returns:
             Query results as dict or list of dicts
         """
-        conn = self._get_connection()
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(query, params)
+        with self._get_connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(query, params)
 
-            if query.strip().upper().startswith('SELECT'):
-                if fetch_one:
-                    return dict(cur.fetchone()) if cur.rowcount > 0 else None
+                if query.strip().upper().startswith('SELECT'):
+                    if fetch_one:
+                        return dict(cur.fetchone()) if cur.rowcount > 0 else None
+                    else:
+                        return [dict(row) for row in cur.fetchall()]
                 else:
-                    return [dict(row) for row in cur.fetchall()]
-            else:
-                conn.commit()
-                return cur.rowcount > 0
+                    conn.commit()
+                    return cur.rowcount > 0
 
     # ==================== Authentication Tools ====================
 
@@ -432,155 +472,154 @@ class DatabaseTools:
         Returns:
             True if successful
         """
-        conn = self._get_connection()
+        with self._get_connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    # Handle cancellation
+                    if cancellation_details:
+                        # Cancel leave and refund balance
+                        cancel_query = """
+                            UPDATE leave_register lr
+                            SET status = 'Cancelled',
+                                cancelled_by_hm_id = (SELECT id FROM housemasters WHERE hm_id = %s),
+                                cancellation_reason = %s,
+                                cancelled_date = CURRENT_TIMESTAMP
+                            WHERE lr.student_admin_number = %s
+                              AND lr.status = 'Approved'
+                              AND lr.departure_timestamp IS NULL
+                            RETURNING leave_type
+                        """
 
-        try:
-            with conn.cursor() as cur:
-                # Handle cancellation
-                if cancellation_details:
-                    # Cancel leave and refund balance
-                    cancel_query = """
-                        UPDATE leave_register lr
-                        SET status = 'Cancelled',
-                            cancelled_by_hm_id = (SELECT id FROM housemasters WHERE hm_id = %s),
-                            cancellation_reason = %s,
-                            cancelled_date = CURRENT_TIMESTAMP
-                        WHERE lr.student_admin_number = %s
-                          AND lr.status = 'Approved'
-                          AND lr.departure_timestamp IS NULL
-                        RETURNING leave_type
-                    """
+                        cur.execute(cancel_query, (
+                            cancellation_details.get('hmID'),
+                            cancellation_details.get('reason'),
+                            student_admin_number
+                        ))
 
-                    cur.execute(cancel_query, (
-                        cancellation_details.get('hmID'),
-                        cancellation_details.get('reason'),
-                        student_admin_number
-                    ))
+                        cancelled_leave = cur.fetchone()
+
+                        if cancelled_leave:
+                            # Refund balance if applicable
+                            cancelled_type = cancelled_leave[0]
+                            if cancelled_type == 'Overnight':
+                                refund_column = 'overnight_remaining'
+                            elif cancelled_type == 'Friday Supper':
+                                refund_column = 'friday_supper_remaining'
+                            else:
+                                refund_column = None
+
+                            if refund_column:
+                                refund_query = f"""
+                                    UPDATE leave_balances lb
+                                    SET {refund_column} = {refund_column} + 1
+                                    FROM students s
+                                    WHERE lb.student_id = s.id
+                                      AND s.admin_number = %s
+                                """
+                                cur.execute(refund_query, (student_admin_number,))
+
+                        conn.commit()
+                        return True
+
+                    # Handle departure logging
+                    if departure_timestamp:
+                        departure_query = """
+                            UPDATE leave_register
+                            SET departure_timestamp = %s,
+                                driver_id_capture = %s
+                            WHERE student_admin_number = %s
+                              AND status = 'Approved'
+                              AND start_date <= %s
+                              AND end_date >= %s
+                              AND departure_timestamp IS NULL
+                        """
 
-                    cancelled_leave = cur.fetchone()
+                        cur.execute(departure_query, (
+                            departure_timestamp,
+                            driver_id_capture,
+                            student_admin_number,
+                            departure_timestamp,
+                            departure_timestamp
+                        ))
 
-                    if cancelled_leave:
-                        # Refund balance if applicable
-                        cancelled_type = cancelled_leave[0]
-                        if cancelled_type == 'Overnight':
-                            refund_column = 'overnight_remaining'
-                        elif cancelled_type == 'Friday Supper':
-                            refund_column = 'friday_supper_remaining'
-                        else:
-                            refund_column = None
+                        conn.commit()
+                        return cur.rowcount > 0
+
+                    # Handle new leave approval
+                    # 1. Insert into leave register
+                    name_parts = student_name.split(' ', 1)
+                    first_name = name_parts[0]
+                    last_name = name_parts[1] if len(name_parts) > 1 else ''
+
+                    leave_id = f"LEAVE_{uuid.uuid4().hex[:8].upper()}"
+
+                    insert_query = """
+                        INSERT INTO leave_register (
+                            leave_id, student_id, student_admin_number,
+                            student_first_name, student_last_name, student_house, student_block,
+                            leave_type, start_date, end_date,
+                            requesting_parent_id, requesting_parent_name,
+                            approved_date, status
+                        )
+                        SELECT
+                            %s, s.id, s.admin_number,
+                            %s, %s, %s, %s,
+                            %s, %s, %s,
+                            p.id, p.first_name || ' ' || p.last_name,
+                            CURRENT_TIMESTAMP, 'Approved'
+                        FROM students s
+                        LEFT JOIN parents p ON p.parent_id = %s
+                        WHERE s.admin_number = %s
+                    """
 
-                        if refund_column:
-                            refund_query = f"""
+                    cur.execute(insert_query, (
+                        leave_id, first_name, last_name, house, block,
+                        leave_type, start_date, end_date,
+                        requesting_parent, student_admin_number
+                    ))
+
+                    # 2. Deduct balance if applicable
+                    if leave_type == 'Overnight':
+                        balance_column = 'overnight_remaining'
+                    elif leave_type == 'Friday Supper':
+                        balance_column = 'friday_supper_remaining'
+                    else:
+                        balance_column = None
+
+                    if balance_column:
+                        # Get current term
+                        cur.execute("""
+                            SELECT term_number, year
+                            FROM term_config
+                            WHERE CURRENT_DATE BETWEEN start_date AND end_date
+                            LIMIT 1
+                        """)
+                        term_info = cur.fetchone()
+
+                        if term_info:
+                            update_balance_query = f"""
                                 UPDATE leave_balances lb
-                                SET {refund_column} = {refund_column} + 1
+                                SET {balance_column} = {balance_column} - 1
                                 FROM students s
                                 WHERE lb.student_id = s.id
                                   AND s.admin_number = %s
+                                  AND lb.term_number = %s
+                                  AND lb.year = %s
                             """
-                            cur.execute(refund_query, (student_admin_number,))
 
-                    conn.commit()
-                    return True
-
-                # Handle departure logging
-                if departure_timestamp:
-                    departure_query = """
-                        UPDATE leave_register
-                        SET departure_timestamp = %s,
-                            driver_id_capture = %s
-                        WHERE student_admin_number = %s
-                          AND status = 'Approved'
-                          AND start_date <= %s
-                          AND end_date >= %s
-                          AND departure_timestamp IS NULL
-                    """
-
-                    cur.execute(departure_query, (
-                        departure_timestamp,
-                        driver_id_capture,
-                        student_admin_number,
-                        departure_timestamp,
-                        departure_timestamp
-                    ))
+                            cur.execute(update_balance_query, (
+                                student_admin_number,
+                                term_info[0],
+                                term_info[1]
+                            ))
 
                     conn.commit()
-                    return cur.rowcount > 0
-
-                # Handle new leave approval
-                # 1. Insert into leave register
-                name_parts = student_name.split(' ', 1)
-                first_name = name_parts[0]
-                last_name = name_parts[1] if len(name_parts) > 1 else ''
-
-                leave_id = f"LEAVE_{uuid.uuid4().hex[:8].upper()}"
-
-                insert_query = """
-                    INSERT INTO leave_register (
-                        leave_id, student_id, student_admin_number,
-                        student_first_name, student_last_name, student_house, student_block,
-                        leave_type, start_date, end_date,
-                        requesting_parent_id, requesting_parent_name,
-                        approved_date, status
-                    )
-                    SELECT
-                        %s, s.id, s.admin_number,
-                        %s, %s, %s, %s,
-                        %s, %s, %s,
-                        p.id, p.first_name || ' ' || p.last_name,
-                        CURRENT_TIMESTAMP, 'Approved'
-                    FROM students s
-                    LEFT JOIN parents p ON p.parent_id = %s
-                    WHERE s.admin_number = %s
-                """
-
-                cur.execute(insert_query, (
-                    leave_id, first_name, last_name, house, block,
-                    leave_type, start_date, end_date,
-                    requesting_parent, student_admin_number
-                ))
-
-                # 2. Deduct balance if applicable
-                if leave_type == 'Overnight':
-                    balance_column = 'overnight_remaining'
-                elif leave_type == 'Friday Supper':
-                    balance_column = 'friday_supper_remaining'
-                else:
-                    balance_column = None
-
-                if balance_column:
-                    # Get current term
-                    cur.execute("""
-                        SELECT term_number, year
-                        FROM term_config
-                        WHERE CURRENT_DATE BETWEEN start_date AND end_date
-                        LIMIT 1
-                    """)
-                    term_info = cur.fetchone()
-
-                    if term_info:
-                        update_balance_query = f"""
-                            UPDATE leave_balances lb
-                            SET {balance_column} = {balance_column} - 1
-                            FROM students s
-                            WHERE lb.student_id = s.id
-                              AND s.admin_number = %s
-                              AND lb.term_number = %s
-                              AND lb.year = %s
-                        """
-
-                        cur.execute(update_balance_query, (
-                            student_admin_number,
-                            term_info[0],
-                            term_info[1]
-                        ))
-
-                conn.commit()
-                return True
+                    return True
 
-        except Exception as e:
-            conn.rollback()
-            print(f"Error in tool_leave_update: {e}")
-            return False
+            except Exception as e:
+                conn.rollback()
+                print(f"Error in tool_leave_update: {e}")
+                return False
 
     def tool_leave_lookup(
         self,
@@ -781,10 +820,27 @@ class DatabaseTools:
         print(f"       Data: {data}")
         return True
 
+    def housemaster_emails(self) -> Set[str]:
+        """Lowercased email addresses of all active housemasters"""
+        query = """
+            SELECT LOWER(email) AS email
+            FROM housemasters
+            WHERE email IS NOT NULL AND active = true
+        """
+        return {row['email'] for row in self._execute_query(query)}
+
+    def ping(self) -> bool:
+        """Check that a pooled connection can run a query"""
+        with self._get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+                return cur.fetchone() is not None
+
     def close(self):
-        """Close database connection"""
-        if self._connection and not self._connection.closed:
-            self._connection.close()
+        """Close all pooled database connections"""
+        pool = getattr(self, '_pool', None)
+        if pool is not None and not pool.closed:
+            pool.closeall()
 
     def __del__(self):
         """Cleanup on deletion"""
@@ -123,6 +123,6 @@ def create_sheets_backend():
 
     Usage:
         tools = create_sheets_backend()
-        processor.tools = tools
+        processor = LeaveProcessor(tools=tools)
     """
     return GoogleSheetsSimple()
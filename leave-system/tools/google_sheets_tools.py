@@ -45,6 +45,9 @@ class GoogleSheetsTools(LeaveSystemTools):
     - Sheet 9: "housemasters" - Housemaster information
     """
 
+    # One googleapiclient service (httplib2 transport) is shared by every call
+    thread_safe = False
+
     def __init__(self, credentials_path: Optional[str] = None, sheet_id: Optional[str] = None):
         """
         Initialize Google Sheets backend.
@@ -10,6 +10,10 @@ from typing import Optional, Dict, List, Any
 class LeaveSystemTools:
     """Placeholder implementations of all required tool calls"""
 
+    # True if tool calls may run from several threads at once; the processor
+    # only overlaps lookups for backends that set it
+    thread_safe = False
+
     # ==================== Authentication Tools ====================
 
     @staticmethod